@@ -1,23 +1,46 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from datetime import date, datetime
 from pydantic import BaseModel
 from typing import List, Optional
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+import asyncio
 
 # Removed ChatRequest and ChatResponse from imports to avoid conflict with local definitions
 from models.schemas import (
-    TaskInput, TaskUpdate, TaskResponse
+    TaskInput, TaskUpdate, TaskResponse, TaskBatchUpdate
 )
 from services.google_sheets_service import (
-    fetch_all_tasks, add_task_to_sheet, 
+    add_task_to_sheet, 
     update_task_status, search_tasks,
     update_task_field
 )
 from services.openai_service import (
     generate_ai_response, 
+    stream_ai_response,
+    TOOL_TIMINGS,
     summarize_tasks,
     simple_ai_chat
 )
+from services.llm_gateway import cancel_on_disconnect
+from services.chat_sessions import get_or_create_session, get_session_context, record_exchange
+from services.llm_cache import get_cache_stats
+from services.tool_cache import get_tool_cache_stats
+from services.model_router import get_model_stats
+from services.scheduler import get_artifacts, refresh_artifacts
+from services.task_store import peek_snapshot_version, get_task_snapshot, version_token
+from services.kpis import get_kpis
+from services.change_log import get_changes_since_token
+from services.task_feed import task_events, get_feed_stats
+from services.task_batch import batch_update_tasks
+from services.dashboard import build_dashboard
+from services.task_export import EXPORT_FORMATS, export_columns, parquet_engine_available, stream_export
+from services.task_query import filter_tasks, project_tasks, paginate, make_etag, etag_matches
+from services.workload import build_workload_report
+from services.task_history import get_history_stats
+from services.email_outbox import get_email_status, get_outbox_stats
+from services.digest import send_digests
+from config import WORKLOAD_MAX_CONCURRENT, CHAT_SESSION_RECENT_MESSAGES
 from services.mermaid import (
     generate_mermaid_gantt,
     generate_mermaid_flowchart
@@ -31,11 +54,14 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     prompt: str 
     conversation_history: Optional[List[ChatMessage]] = None
+    # Server-side history: send the id from the previous response instead of conversation_history
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     timestamp: datetime
     status: str = "success" 
+    session_id: Optional[str] = None
 
 class SimpleAskRequest(BaseModel):
     question: str
@@ -46,12 +72,80 @@ router = APIRouter(prefix="/api", tags=["tasks"])
 # ✅ TASK MANAGEMENT ENDPOINTS
 
 @router.get("/tasks", response_model=dict)
-def get_all_tasks():
-    """Retrieve all tasks from the spreadsheet"""
-    tasks = fetch_all_tasks()
+def get_all_tasks(
+    request: Request,
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    assignee: Optional[str] = Query(None, description="Comma-separated assignees"),
+    client: Optional[str] = Query(None, description="Comma-separated clients"),
+    due_before: Optional[date] = Query(None, description="Only tasks with end_date on or before this date"),
+    active_on: Optional[date] = Query(None, description="Only tasks whose start..end range covers this date"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. task_id,Task_Name,status"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """Retrieve tasks from the spreadsheet (filterable, projectable, paginated; supports If-None-Match)"""
+    snapshot = get_task_snapshot()
+    etag = make_etag(
+        "tasks", snapshot.content_hash, status=status, assignee=assignee, client=client, due_before=due_before,
+        active_on=active_on, fields=fields, limit=limit, offset=offset, cursor=cursor
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    matches = filter_tasks(snapshot.tasks, status, assignee, client, due_before, active_on)
+    page, next_cursor = paginate(matches, limit, offset, cursor)
+    page, unknown_fields = project_tasks(page, fields)
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown_fields)}")
+
+    # No per-request timestamp: the body only changes with the snapshot version
+    return JSONResponse(
+        content={
+            "count": len(page),
+            "total": len(matches),
+            "tasks": page,
+            "next_cursor": next_cursor,
+            "snapshot_version": snapshot.version,
+            "version_token": version_token(snapshot.version),
+            "status": "success"
+        },
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@router.get("/tasks/export")
+def export_tasks(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$"),
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    assignee: Optional[str] = Query(None, description="Comma-separated assignees"),
+    client: Optional[str] = Query(None, description="Comma-separated clients"),
+    due_before: Optional[date] = Query(None, description="Only tasks with end_date on or before this date"),
+    active_on: Optional[date] = Query(None, description="Only tasks whose start..end range covers this date"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export (default: all)")
+):
+    """Download tasks as CSV, NDJSON or Parquet, streamed from the task snapshot (same filters as GET /tasks)"""
+    if export_format == "parquet" and not parquet_engine_available():
+        raise HTTPException(status_code=501, detail="Parquet export is unavailable: pyarrow (listed in requirements.txt) is not installed on this server")
+
+    snapshot = get_task_snapshot()
+    columns, unknown_fields = export_columns(snapshot.tasks, fields)
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown_fields)}")
+    matches = filter_tasks(snapshot.tasks, status, assignee, client, due_before, active_on)
+
+    filename = f"tasks_v{snapshot.version}_{date.today().isoformat()}.{export_format}"
+    return StreamingResponse(
+        stream_export(matches, columns, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-cache"}
+    )
+
+@router.get("/tasks/changes", response_model=dict)
+def get_task_changes(since: str = Query(..., description="version_token the client already has")):
+    """Tasks added / updated / deleted since a version token (full_refetch=true if it's no longer known)"""
+    snapshot = get_task_snapshot()
     return {
-        "count": len(tasks),
-        "tasks": tasks,
+        **get_changes_since_token(since, snapshot.version),
         "timestamp": datetime.now().isoformat(),
         "status": "success"
     }
@@ -70,6 +164,21 @@ def create_task(task: TaskInput):
         "status": "success"
     }
 
+@router.patch("/tasks", response_model=dict)
+def patch_tasks(batch: TaskBatchUpdate):
+    """
+    Update many tasks with a single Sheets write.
+    Entries select tasks by task_id, task_name or `where` filters; each gets its own result.
+    """
+    result = batch_update_tasks([update.model_dump() for update in batch.updates])
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {
+        **result,
+        "timestamp": datetime.now().isoformat(),
+        "status": "success" if not result["failed"] else "partial"
+    }
+
 @router.put("/tasks/{task_name}", response_model=dict)
 def update_task(task_name: str, update: TaskUpdate):
     """
@@ -127,26 +236,51 @@ def search_all_tasks(query: str = Query(..., min_length=1)):
 
 # ✅ AI CHAT ENDPOINTS
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    try:
+def resolve_conversation(request: ChatRequest) -> tuple:
+    """
+    Returns (session_id, history, summary) for a chat request.
+    Clients that still send conversation_history without a session_id keep the stateless behaviour.
+    """
+    if request.conversation_history and not request.session_id:
         # Ensure all history items are strings to prevent type errors
         # This rebuilds the list ensuring 'content' is strictly a string
-        conversation_history = [
+        # No summary exists for client-held history, so only the most recent messages are sent
+        history = [
             ChatMessage(role=msg.role, content=str(msg.content)) 
-            for msg in (request.conversation_history or [])
+            for msg in request.conversation_history[-CHAT_SESSION_RECENT_MESSAGES:]
         ]
+        return None, history, None
 
-        # Generate AI response
-        response_text = generate_ai_response(
-            user_message=request.prompt,
-            conversation_history=conversation_history
+    session_id = get_or_create_session(request.session_id)["id"]
+    summary, history = get_session_context(session_id)
+    return session_id, history, summary
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    try:
+        session_id, conversation_history, conversation_summary = resolve_conversation(request)
+
+        # Generate AI response (cancelled if the client disconnects mid-turn)
+        response_text = await cancel_on_disconnect(
+            http_request,
+            generate_ai_response(
+                user_message=request.prompt,
+                conversation_history=conversation_history,
+                conversation_summary=conversation_summary
+            )
         )
+        if response_text is None:
+            return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+
+        if session_id:
+            record_exchange(session_id, request.prompt, response_text)
         
         # Return structured response with timestamp
         return ChatResponse(
             response=response_text,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.utcnow(),
+            session_id=session_id
         )
         
     except Exception as e:
@@ -160,25 +294,170 @@ async def chat(request: ChatRequest):
             }
         )
 
+def format_sse(event: str, data) -> str:
+    """Serialize one Server-Sent Event (data is always JSON encoded)"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat.
+    Emits SSE events: 'status' (tool progress), 'token' (answer text), 'done' (full ChatResponse payload), 'error'.
+    """
+    session_id, conversation_history, conversation_summary = resolve_conversation(request)
+
+    # Starlette stops iterating (and the LLM stream is closed) when the client disconnects
+    async def event_stream():
+        async for event in stream_ai_response(
+            user_message=request.prompt,
+            conversation_history=conversation_history,
+            conversation_summary=conversation_summary
+        ):
+            if event["event"] == "done":
+                event["data"]["session_id"] = session_id
+                if session_id:
+                    record_exchange(session_id, request.prompt, event["data"]["response"])
+            yield format_sse(event["event"], event["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stream/tasks")
+async def stream_task_changes(request: Request, since: Optional[str] = Query(None, description="version_token the client already has")):
+    """
+    Live task changes over SSE.
+    Emits 'snapshot' (current version) on connect, 'delta' on every version bump and 'resync' when the client must refetch.
+    Reconnecting browsers resume from their Last-Event-ID.
+    """
+    # On reconnect the browser repeats the original URL, so Last-Event-ID wins over ?since=
+    since = request.headers.get("last-event-id") or since
+
+    return StreamingResponse(
+        task_events(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/summary", response_model=dict)
-def get_project_summary():
+async def get_project_summary(http_request: Request, response: Response):
     """Get an AI-generated summary of all project tasks"""
-    summary = summarize_tasks()
+    # Last precomputed summary (refreshed in the background); computed inline only before the first run
+    artifacts = get_artifacts()
+    if artifacts is not None and artifacts["summary"] is not None:
+        response.headers["X-Cache"] = "HIT"
+        return {
+            "summary": artifacts["summary"],
+            "snapshot_version": artifacts["version"],
+            "computed_at": artifacts["computed_at"],
+            "timestamp": datetime.now().isoformat(),
+            "status": "success"
+        }
+
+    result = await cancel_on_disconnect(http_request, summarize_tasks())
+    if result is None:
+        return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+    summary, cache_status = result
+    response.headers["X-Cache"] = cache_status
     return {
         "summary": summary,
         "timestamp": datetime.now().isoformat(),
         "status": "success"
     }
 
+@router.get("/insights", response_model=dict)
+async def get_insights():
+    """Precomputed summary, status statistics, schedule conflicts and due-soon list"""
+    artifacts = get_artifacts() or await refresh_artifacts()
+    return {
+        "snapshot_version": artifacts["version"],
+        "summary": artifacts["summary"],
+        "statistics": artifacts["statistics"],
+        "conflicts": artifacts["conflicts"],
+        "due_soon": artifacts["due_soon"],
+        "computed_at": artifacts["computed_at"],
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
+@router.get("/kpis", response_model=dict)
+def get_dashboard_kpis(request: Request):
+    """Server-computed dashboard metrics; supports If-None-Match"""
+    snapshot = get_task_snapshot()
+    kpis, etag = get_kpis(snapshot)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(
+        content={**kpis, "snapshot_version": snapshot.version, "status": "success"},
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@router.get("/dashboard", response_model=dict)
+async def get_dashboard(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated task columns to return"),
+    client: Optional[str] = Query(None, description="Comma-separated clients (narrows tasks, KPIs and diagrams)"),
+    diagrams: Optional[str] = Query(None, description="Comma-separated Mermaid diagrams: gantt, flowchart")
+):
+    """Tasks, KPIs, clients and optional diagrams from one snapshot in one response; supports If-None-Match"""
+    snapshot = await asyncio.to_thread(get_task_snapshot)
+    etag = make_etag("dashboard", snapshot.content_hash, day=date.today(), fields=fields, client=client, diagrams=diagrams)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    requested = [name.strip() for name in (diagrams or "").split(",") if name.strip()]
+    try:
+        bundle = await build_dashboard(snapshot, fields, client, requested)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return JSONResponse(
+        content={**bundle, "snapshot_version": snapshot.version, "version_token": version_token(snapshot.version), "status": "success"},
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@router.get("/resources/timeline", response_model=dict)
+def get_resource_timeline(
+    assignee: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    max_concurrent: int = Query(WORKLOAD_MAX_CONCURRENT, ge=1)
+):
+    """Per-assignee concurrent open tasks over time, with over-allocation windows"""
+    snapshot = get_task_snapshot()
+    return {
+        "max_concurrent": max_concurrent,
+        "assignees": build_workload_report(snapshot.tasks, assignee, start, end, max_concurrent),
+        "snapshot_version": snapshot.version,
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
+@router.get("/stats/history", response_model=dict)
+def get_task_history_stats(days: int = Query(30, ge=1, le=365)):
+    """Burn-down, weekly velocity and slippage from the recorded task history"""
+    return {
+        **get_history_stats(days),
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
 # ✅ SIMPLE ASK ENDPOINT (For Summaries with Hard Facts)
 
 @router.post("/ask", response_model=dict)
-def ask_simple_question(request: SimpleAskRequest):
+async def ask_simple_question(request: SimpleAskRequest, http_request: Request, response: Response):
     """
     Receives a prompt (with calculated stats) and returns a text answer.
     """
     try:
-        answer = simple_ai_chat(request.question)
+        result = await cancel_on_disconnect(http_request, simple_ai_chat(request.question))
+        if result is None:
+            return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+        answer, cache_status = result
+        response.headers["X-Cache"] = cache_status
         return {
             "answer": answer,
             "timestamp": datetime.now().isoformat(),
@@ -199,13 +478,49 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@router.get("/metrics", response_model=dict)
+def get_metrics():
+    """Cache hit rates and per-tool timings for tuning"""
+    return {
+        "snapshot_version": peek_snapshot_version(),
+        "tool_timings": TOOL_TIMINGS,
+        "tool_cache": get_tool_cache_stats(),
+        "llm_cache": get_cache_stats(),
+        "models": get_model_stats(),
+        "email_outbox": get_outbox_stats(),
+        "task_feed": get_feed_stats(),
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
+@router.get("/emails/{message_id}", response_model=dict)
+def get_email(message_id: str):
+    """Delivery status of a queued email"""
+    message = get_email_status(message_id)
+    if message is None:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return {
+        "email": message,
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
+@router.post("/digests/send", response_model=dict)
+def trigger_digests(dry_run: bool = False):
+    """Queue digest emails now (dry_run=true only reports what would be sent)"""
+    return {
+        **send_digests(dry_run=dry_run),
+        "timestamp": datetime.now().isoformat(),
+        "status": "success"
+    }
+
 # --- Mermaid APIs ---
 
 @router.get("/viz/gantt")
 async def get_gantt():
     try:
-        # 1. Fetch the data from your Google Sheets
-        tasks = fetch_all_tasks() 
+        # 1. Use the shared task snapshot (re-read from Google Sheets only when stale)
+        tasks = (await asyncio.to_thread(get_task_snapshot)).tasks
         #print(f"DEBUG: tasks is a {type(tasks)} | Content: {tasks[:1] if tasks else 'Empty'}")
         # 2. Pass tasks to the Gantt generator
         chart_code = generate_mermaid_gantt(tasks)
@@ -220,8 +535,8 @@ async def get_gantt():
 @router.get("/viz/flowchart")
 async def get_flowchart():
     try:
-        # 1. Fetch the data from your Google Sheets service
-        tasks = fetch_all_tasks() 
+        # 1. Use the shared task snapshot (re-read from Google Sheets only when stale)
+        tasks = (await asyncio.to_thread(get_task_snapshot)).tasks
         #print(f"DEBUG: tasks is a {type(tasks)} | Content: {tasks[:1] if tasks else 'Empty'}")
         # 2. Pass that data into the flowchart generator
         chart_code = generate_mermaid_flowchart(tasks)
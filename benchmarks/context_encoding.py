@@ -0,0 +1,115 @@
+"""
+Prompt-size benchmark: verbose vs compact task context encoding.
+
+Usage:
+    python -m benchmarks.context_encoding                 # synthetic tasks, offline
+    python -m benchmarks.context_encoding --rows 500
+    python -m benchmarks.context_encoding --sheet         # real tasks from Google Sheets
+    python -m benchmarks.context_encoding --live          # also measure time-to-first-token on Groq
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_gateway import stream_chat_completion
+from services.openai_service import format_tasks_for_context, format_tasks_compact
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, otherwise the usual ~4 chars/token estimate"""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except Exception:
+        # tiktoken missing, or its vocabulary file can't be downloaded (offline)
+        return len(text) // 4
+
+
+def make_synthetic_tasks(rows: int) -> list:
+    """Tasks shaped like the Task_Manager sheet rows"""
+    random.seed(42)
+    start = datetime.now() - timedelta(days=60)
+    tasks = []
+    for i in range(1, rows + 1):
+        begin = start + timedelta(days=random.randint(0, 120))
+        tasks.append({
+            "task_id": i,
+            "Task_Name": f"Task {i} - {random.choice(['Site survey', 'RAN upgrade', 'Core migration', 'UAT', 'Go-live'])}",
+            "start_date": begin.strftime("%Y-%m-%d"),
+            "end_date": (begin + timedelta(days=random.randint(1, 30))).strftime("%Y-%m-%d"),
+            "status": random.choice(["Pending", "In Progress", "Completed", "On Hold"]),
+            "assigned_to": random.choice(["Jasneet", "Ali", "Priya", "Omar", "Unassigned"]),
+            "Client": random.choice(["DU UAE", "Etisalat", "Batelco"]),
+            "Priority": random.choice(["High", "Medium", "Low"]),
+            "predecessor": str(i - 1) if i > 1 and random.random() < 0.4 else "",
+        })
+    return tasks
+
+
+async def time_to_first_token(context: str, model: str = "llama-3.1-8b-instant") -> float:
+    """Seconds until the first streamed content token arrives"""
+    started = time.perf_counter()
+    stream = stream_chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": f"You are a project assistant.\n{context}"},
+            {"role": "user", "content": "How many tasks are overdue?"}
+        ],
+        temperature=0.1,
+        max_tokens=50
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Number of synthetic tasks")
+    parser.add_argument("--sheet", action="store_true", help="Use the real Google Sheet instead of synthetic tasks")
+    parser.add_argument("--live", action="store_true", help="Measure time-to-first-token against the LLM provider")
+    args = parser.parse_args()
+
+    if args.sheet:
+        from services.google_sheets_service import fetch_all_tasks
+        tasks = fetch_all_tasks()
+    else:
+        tasks = make_synthetic_tasks(args.rows)
+
+    results = {}
+    for name, encoder in (("verbose", format_tasks_for_context), ("compact", format_tasks_compact)):
+        started = time.perf_counter()
+        text = encoder(tasks)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results[name] = {"text": text, "chars": len(text), "tokens": count_tokens(text), "encode_ms": elapsed_ms}
+
+    # Second compact call for the same snapshot hits the per-snapshot cache
+    format_tasks_compact(tasks, content_hash="benchmark")
+    started = time.perf_counter()
+    format_tasks_compact(tasks, content_hash="benchmark")
+    cached_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Tasks: {len(tasks)}")
+    print(f"{'encoding':<10}{'chars':>10}{'tokens':>10}{'encode ms':>12}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['chars']:>10}{r['tokens']:>10}{r['encode_ms']:>12.2f}")
+    saved = 1 - results["compact"]["tokens"] / max(results["verbose"]["tokens"], 1)
+    print(f"Token savings: {saved:.1%} | cached compact encode: {cached_ms:.2f} ms")
+
+    if args.live:
+        async def measure_all():
+            return {name: await time_to_first_token(r["text"]) for name, r in results.items()}
+
+        for name, ttft in asyncio.run(measure_all()).items():
+            print(f"TTFT {name:<8}: {ttft:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
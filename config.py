@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,3 +19,107 @@ API_VERSION = "1.0.0"
 DEBUG_MODE = os.getenv("DEBUG", "False") == "True"
 PORT = int(os.getenv("PORT", 8000))
 HOST = os.getenv("HOST", "0.0.0.0")
+
+# Responses larger than this (bytes) are gzip-compressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 1000))
+
+# LLM Prompt Configuration
+# 'compact' = header + delimited rows, 'verbose' = one labelled line per task
+CONTEXT_ENCODING = os.getenv("CONTEXT_ENCODING", "compact").lower()
+
+# Task Snapshot Cache (seconds before the sheet is re-read; writes invalidate immediately)
+TASK_SNAPSHOT_TTL_SECONDS = float(os.getenv("TASK_SNAPSHOT_TTL_SECONDS", 30))
+
+# Cached sheet header positions for targeted column reads
+SHEET_HEADER_TTL_SECONDS = float(os.getenv("SHEET_HEADER_TTL_SECONDS", 300))
+
+# LLM Response Cache
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 6 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 256))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")  # e.g. "llm_cache.json"; empty = memory only
+LLM_CACHE_SAVE_DELAY_SECONDS = float(os.getenv("LLM_CACHE_SAVE_DELAY_SECONDS", 5))  # Writes within this window are batched
+
+# Memoized analytic chat tools
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 512))
+
+# Server-side chat sessions
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", 500))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 6 * 3600))
+CHAT_SESSION_RECENT_MESSAGES = int(os.getenv("CHAT_SESSION_RECENT_MESSAGES", 6))  # Kept verbatim after compaction; older ones are summarized
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", 200))
+
+# LLM Gateway Configuration
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))
+
+# Chat Fast Path (answer structured lookups locally, without the LLM)
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "True") == "True"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", 0.8))
+
+# Per-tool response policy overrides, e.g. "filter_tasks_by_date=llm,check_schedule_conflicts=local"
+# Policies: local (template), raw (tool text as-is), llm (second LLM call phrases the result)
+TOOL_RESPONSE_POLICY_OVERRIDES = dict(
+    item.split("=", 1) for item in os.getenv("TOOL_RESPONSE_POLICIES", "").replace(" ", "").split(",") if "=" in item
+)
+
+# Model tiering: per task type model list (preference order) and latency budget in seconds, e.g.
+# MODEL_ROUTES='{"summarization": {"models": ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"], "latency_budget": 8}}'
+def _load_model_routes() -> dict:
+    """A malformed MODEL_ROUTES falls back to the built-in routes instead of failing startup"""
+    try:
+        routes = json.loads(os.getenv("MODEL_ROUTES", "") or "{}")
+    except ValueError as e:
+        print(f"❌ Ignoring MODEL_ROUTES, not valid JSON: {e}")
+        return {}
+    if not isinstance(routes, dict):
+        print("❌ Ignoring MODEL_ROUTES, expected a JSON object")
+        return {}
+    return routes
+
+
+MODEL_ROUTE_OVERRIDES = _load_model_routes()
+
+# Background precomputation (APScheduler)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "True") == "True"
+PRECOMPUTE_INTERVAL_SECONDS = float(os.getenv("PRECOMPUTE_INTERVAL_SECONDS", TASK_SNAPSHOT_TTL_SECONDS))  # Capped at the snapshot TTL
+
+# Dashboard KPIs
+KPI_DUE_SOON_DAYS = int(os.getenv("KPI_DUE_SOON_DAYS", 7))
+
+# Resource workload timeline
+WORKLOAD_MAX_CONCURRENT = int(os.getenv("WORKLOAD_MAX_CONCURRENT", 3))  # More open tasks at once = over-allocated
+
+# Task history (append-only change log for trend analytics)
+TASK_HISTORY_PATH = os.getenv("TASK_HISTORY_PATH", "task_history.ndjson")  # empty = disabled
+TASK_HISTORY_RETENTION_DAYS = int(os.getenv("TASK_HISTORY_RETENTION_DAYS", 180))  # Older deltas fold into a baseline
+
+# Email outbox (background Brevo sender)
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 4))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 2))  # Doubles each retry
+EMAIL_DEDUP_WINDOW_SECONDS = float(os.getenv("EMAIL_DEDUP_WINDOW_SECONDS", 300))
+EMAIL_OUTBOX_MAX_MESSAGES = int(os.getenv("EMAIL_OUTBOX_MAX_MESSAGES", 500))
+EMAIL_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.sqlite3")  # SQLite file; empty = memory only
+
+# Digest emails
+DIGEST_ENABLED = os.getenv("DIGEST_ENABLED", "False") == "True"
+DIGEST_INTERVAL_HOURS = float(os.getenv("DIGEST_INTERVAL_HOURS", 24))
+DIGEST_MIN_INTERVAL_SECONDS = float(os.getenv("DIGEST_MIN_INTERVAL_SECONDS", 12 * 3600))  # Per recipient
+DIGEST_MAX_EVENTS = int(os.getenv("DIGEST_MAX_EVENTS", 100))  # Status changes kept per recipient
+# Assignee -> email, e.g. "Jasneet=jasneet@example.com,Ali=ali@example.com" (the admin always gets everything)
+DIGEST_RECIPIENTS = {
+    name.strip().lower(): email.strip()
+    for name, email in (item.split("=", 1) for item in os.getenv("DIGEST_RECIPIENTS", "").split(",") if "=" in item)
+}
+
+# Shared cross-process task cache (SQLite WAL file; lets several workers share one sheet read)
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")  # e.g. "/tmp/task_cache.sqlite3"; empty = per-process
+SHARED_REFRESH_LEASE_SECONDS = float(os.getenv("SHARED_REFRESH_LEASE_SECONDS", 15))
+
+# Delta sync (GET /api/tasks/changes)
+CHANGE_LOG_MAX_VERSIONS = int(os.getenv("CHANGE_LOG_MAX_VERSIONS", 200))
+
+# Live task feed (GET /api/stream/tasks)
+TASK_FEED_HEARTBEAT_SECONDS = int(os.getenv("TASK_FEED_HEARTBEAT_SECONDS", 20))
+TASK_FEED_BACKLOG = int(os.getenv("TASK_FEED_BACKLOG", 50))
@@ -1,8 +1,10 @@
 import { API_BASE_URL } from './config.js';
 
 // Global state
-let conversationHistory = [];
+let chatSessionId = null; // History lives on the server; we only keep the session id
 let allTasksData = []; // <--- 🆕 Add this to store tasks for export
+let taskVersionToken = null; // version_token that allTasksData reflects
+let taskFeed = null; // EventSource for /stream/tasks
 
 // 🔍 1. HEALTH CHECK ENDPOINT
 async function checkHealth() {
@@ -37,55 +39,29 @@ async function getSummary() {
     }
 
     try {
-        // 🔍 3. Check if we actually have data to analyze
-        if (!allTasksData || allTasksData.length === 0) {
-            summaryDisplay.innerHTML = '<div class="loading">⏳ Waiting for task data to arrive...</div>';
-            return;
-        }
-
         summaryDisplay.innerHTML = '<div class="loading">📊 AI is analyzing priorities, deadlines & workload...</div>';
 
-        // 4. Calculate Hard Facts (Logic stays the same)
-        const total = allTasksData.length;
-        const pending = allTasksData.filter(t => (t.status||'').toLowerCase().includes('pending')).length;
-        const progress = allTasksData.filter(t => (t.status||'').toLowerCase().includes('progress')).length;
-        const completed = allTasksData.filter(t => (t.status||'').toLowerCase().includes('completed')).length;
-        const hold = allTasksData.filter(t => (t.status||'').toLowerCase().includes('hold')).length;
-        const cancelled = allTasksData.filter(t => (t.status||'').toLowerCase().includes('cancelled')).length;
-
-        // 5. Prepare data for AI
-        const detailedTasks = allTasksData.map(t => ({
-            task: t.Task_Name,
-            status: t.status,
-            assignee: t.assigned_to || "Unassigned",
-            priority: t.Priority || "N/A",
-            start: t.start_date || "N/A",
-            due: t.end_date || "N/A",
-            client: t.Client || "General"
-        }));
-
-        const prompt = `
-            I need a professional Project Status Report.
-            HARD DATA SUMMARY:
-            - Total Tasks: ${total} | Pending: ${pending} | In Progress: ${progress} | Completed: ${completed}
-            DETAILED TASK LIST (JSON):
-            ${JSON.stringify(detailedTasks)}
-            INSTRUCTIONS: Write a concise summary (max 150 words) covering Blockers, Workload, and Progress.
-        `;
-
-        // 6. Send to Backend
-        const response = await fetch(`${API_BASE_URL}/ask`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question: prompt })
-        });
-
-        if (!response.ok) throw new Error(`HTTP ${response.status}`);
-        
-        const data = await response.json();
-        const aiText = data.answer || data.response || "No summary generated.";
-
-        // 7. Render Output Safely
+        // 3. Server-computed KPIs + the precomputed AI summary (no full task download)
+        const [kpiResponse, summaryResponse] = await Promise.all([
+            fetch(`${API_BASE_URL}/kpis`),
+            fetch(`${API_BASE_URL}/summary`)
+        ]);
+        if (!kpiResponse.ok) throw new Error(`HTTP ${kpiResponse.status}`);
+        if (!summaryResponse.ok) throw new Error(`HTTP ${summaryResponse.status}`);
+
+        const kpis = await kpiResponse.json();
+        const data = await summaryResponse.json();
+        const aiText = data.summary || "No summary generated.";
+
+        const countStatus = (word) => Object.entries(kpis.by_status || {})
+            .filter(([status]) => status.toLowerCase().includes(word))
+            .reduce((sum, [, count]) => sum + count, 0);
+        const total = kpis.total;
+        const pending = countStatus('pending');
+        const progress = countStatus('progress');
+        const completed = kpis.completed;
+
+        // 4. Render Output Safely
         summaryDisplay.innerHTML = 
             `<div class="summary-box">
                 <h3>🧠 Smart Project Analysis</h3>
@@ -94,6 +70,7 @@ async function getSummary() {
                     <span style="color:#e67e22"><b>Pending:</b> ${pending}</span>
                     <span style="color:#17a2b8"><b>Progress:</b> ${progress}</span>
                     <span style="color:#28a745"><b>Done:</b> ${completed}</span>
+                    <span style="color:#dc3545"><b>Overdue:</b> ${kpis.overdue}</span>
                 </div>
                 <div class="ai-content" style="line-height: 1.6;">
                     ${typeof marked !== 'undefined' ? marked.parse(aiText) : aiText.replace(/\n/g, '<br>')}
@@ -121,40 +98,79 @@ async function loadAllTasks() {
             taskListElement.innerHTML = '<div class="loading">🔄 Loading tasks...</div>';
         }
         
-        const response = await fetch(`${API_BASE_URL}/tasks`);
+        // One round trip: tasks, KPIs and clients from the same snapshot
+        const response = await fetch(`${API_BASE_URL}/dashboard`);
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
         
         const data = await response.json();
         
         // ✅ CRITICAL: Save to the global variable so charts can see it
         allTasksData = data.tasks || []; 
+        taskVersionToken = data.version_token;
         console.log('Data synced to allTasksData:', allTasksData);
       
-        // 🚀 TRIGGER THE DROPDOWN UPDATE HERE
-        if (typeof populateClientDropdown === 'function') {
-        populateClientDropdown(allTasksData);
-        }
-
-        
-        // Render List (if on Tasks page)
-        if (taskListElement) {
-            if (allTasksData.length > 0) {
-                taskListElement.innerHTML = allTasksData.map(task => createTaskCard(task)).join('');
-            } else {
-                taskListElement.innerHTML = '<div class="loading">No tasks found.</div>';
-            }
-        }
+        renderTaskViews();
 
-        // ✅ AUTO-REFRESH CHARTS (if on Dashboard)
-        // This replaces the manual "Refresh Data" button requirement
-        if (document.getElementById('statusChart')) renderStatusChart();
-        if (document.getElementById('resourceChart')) renderResourceChart();
+        // 🔴 From now on changes are pushed by the server
+        subscribeTaskFeed();
 
     } catch (error) {
         console.error('Load tasks error:', error);
     }
 }
 
+function renderTaskViews() {
+    const taskListElement = document.getElementById('taskList');
+
+    // 🚀 TRIGGER THE DROPDOWN UPDATE HERE
+    if (typeof populateClientDropdown === 'function') {
+    populateClientDropdown(allTasksData);
+    }
+
+    // Render List (if on Tasks page)
+    if (taskListElement) {
+        if (allTasksData.length > 0) {
+            taskListElement.innerHTML = allTasksData.map(task => createTaskCard(task)).join('');
+        } else {
+            taskListElement.innerHTML = '<div class="loading">No tasks found.</div>';
+        }
+    }
+
+    // ✅ AUTO-REFRESH CHARTS (if on Dashboard)
+    // This replaces the manual "Refresh Data" button requirement
+    if (document.getElementById('statusChart')) renderStatusChart();
+    if (document.getElementById('resourceChart')) renderResourceChart();
+}
+
+// 🔴 LIVE TASK FEED (SSE): apply deltas instead of re-fetching the whole list
+function subscribeTaskFeed() {
+    if (taskFeed || typeof EventSource === 'undefined') return;
+
+    taskFeed = new EventSource(`${API_BASE_URL}/stream/tasks?since=${encodeURIComponent(taskVersionToken)}`);
+    taskFeed.addEventListener('delta', (event) => applyTaskDelta(JSON.parse(event.data)));
+    taskFeed.addEventListener('resync', () => loadAllTasks());
+}
+
+function applyTaskDelta(delta) {
+    // Tokens only compare for equality (versions restart with the server)
+    if (delta.version_token === taskVersionToken) return; // Already have it
+    if (delta.from_token !== taskVersionToken) {
+        loadAllTasks(); // Missed a version or the server restarted: start over
+        return;
+    }
+
+    const keyOf = (task) => String(task.task_id || task.Task_Name || '');
+    const updated = new Map(delta.updated.map(task => [keyOf(task), task]));
+    const deleted = new Set(delta.deleted.map(String));
+
+    allTasksData = allTasksData
+        .filter(task => !deleted.has(keyOf(task)))
+        .map(task => updated.get(keyOf(task)) || task)
+        .concat(delta.added);
+    taskVersionToken = delta.version_token;
+    renderTaskViews();
+}
+
 // --- 🆕 4. CREATE TASK (POST) ---
 // We check if 'taskForm' exists before adding the listener
 const taskFormElement = document.getElementById('taskForm');
@@ -293,40 +309,63 @@ function sendChat(event) {
     // Prepare payload
     const requestPayload = {
         prompt: message,
-        conversation_history: conversationHistory.map(msg => ({
-            role: msg.role,
-            content: typeof msg.content === 'string' ? msg.content : JSON.stringify(msg.content)
-        }))
+        session_id: chatSessionId
     };
     
-    // Send to API
-    fetch(`${API_BASE_URL}/chat`, {
+    // Send to API (streamed: status + tokens arrive as Server-Sent Events)
+    fetch(`${API_BASE_URL}/chat/stream`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
         body: JSON.stringify(requestPayload)
     })
-    .then(response => {
-        if (!response.ok) throw new Error(`HTTP ${response.status}`);
-        return response.json();
+    .then(async response => {
+        if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+        const loadingElement = document.getElementById(loadingId);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedText = '';
+        let finalText = null;
+
+        // Parse SSE frames ("event: x\ndata: {...}\n\n")
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            for (const frame of frames) {
+                const eventLine = frame.split('\n').find(l => l.startsWith('event: '));
+                const dataLine = frame.split('\n').find(l => l.startsWith('data: '));
+                if (!eventLine || !dataLine) continue;
+                const eventName = eventLine.slice(7);
+                const data = JSON.parse(dataLine.slice(6));
+
+                if (eventName === 'status' && loadingElement) {
+                    loadingElement.innerText = `🤖 ${data}`;
+                } else if (eventName === 'token' && loadingElement) {
+                    streamedText += data;
+                    loadingElement.innerText = `🤖 ${streamedText}`;
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                } else if (eventName === 'done') {
+                    finalText = data.response;
+                    if (data.session_id) chatSessionId = data.session_id;
+                } else if (eventName === 'error') {
+                    throw new Error(data);
+                }
+            }
+        }
+        return finalText !== null ? finalText : streamedText;
     })
-    .then(data => {
-        // 1. Remove loading message
+    .then(responseText => {
+        // 1. Remove streaming placeholder
         const loadingElement = document.getElementById(loadingId);
         if (loadingElement) loadingElement.remove();
         
         // 2. Add AI response using smart renderer (Handles Charts/Tables)
-        renderAIMessage(data.response, messagesDiv);
-        
-        // 3. Update conversation history
-        conversationHistory.push(
-            { role: 'user', content: message },
-            { role: 'assistant', content: data.response }
-        );
-        
-        // Trim history
-        if (conversationHistory.length > 10) {
-            conversationHistory = conversationHistory.slice(-10);
-        }
+        renderAIMessage(responseText, messagesDiv);
     })
     .catch(error => {
         console.error('Chat error:', error);
@@ -700,28 +739,10 @@ function downloadTasksCSV() {
         return;
     }
 
-    // 1. Define Headers
-    const headers = ["Task Name", "Assigned To", "Client", "Priority", "Status", "Start Date", "End Date"];
-    
-    // 2. Map Data to Rows
-    const rows = allTasksData.map(task => [
-        `"${task.Task_Name || ''}"`,       // Wrap in quotes to handle commas in text
-        `"${task.assigned_to || ''}"`,
-        `"${task.Client || ''}"`,
-        task.Priority || 1,
-        `"${task.status || ''}"`,
-        task.start_date || '',
-        task.end_date || ''
-    ]);
-
-    // 3. Combine Headers and Rows
-    const csvContent = [headers.join(","), ...rows.map(r => r.join(","))].join("\n");
-
-    // 4. Create Download Link
-    const blob = new Blob([csvContent], { type: "text/csv;charset=utf-8;" });
-    const url = URL.createObjectURL(blob);
+    // Streamed by the server straight from the task snapshot (also: format=ndjson|parquet, filters)
+    const columns = "Task_Name,assigned_to,Client,Priority,status,start_date,end_date";
     const link = document.createElement("a");
-    link.setAttribute("href", url);
+    link.setAttribute("href", `${API_BASE_URL}/tasks/export?format=csv&fields=${columns}`);
     link.setAttribute("download", `project_tasks_${new Date().toISOString().split('T')[0]}.csv`);
     document.body.appendChild(link);
     link.click();
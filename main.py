@@ -1,8 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from datetime import datetime
-from config import API_TITLE, API_VERSION, HOST, PORT
+from config import API_TITLE, API_VERSION, HOST, PORT, GZIP_MINIMUM_SIZE
 from api.endpoints import router
+from services.llm_gateway import close_llm_client
+from services.llm_cache import flush_llm_cache
+from services.scheduler import start_scheduler, stop_scheduler
+from services.email_outbox import start_outbox
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from fastapi.exceptions import RequestValidationError
@@ -32,8 +37,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "ETag"],  # Lets the dashboard see cache hits and revalidate
 )
 
+# Compress JSON bodies (task lists, dashboard bundle); SSE streams are left alone
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 # Add error handler
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
@@ -59,11 +68,16 @@ def root():
 # Startup event
 @app.on_event("startup")
 async def startup_event():
+    start_scheduler()
+    start_outbox()
     print(f"🚀 {API_TITLE} started successfully!")
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    stop_scheduler()
+    await close_llm_client()
+    flush_llm_cache()
     print(f"🛑 {API_TITLE} shut down gracefully")
 
 if __name__ == "__main__":
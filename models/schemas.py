@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Union
 from datetime import datetime
 
 class TaskInput(BaseModel):
@@ -34,6 +34,22 @@ class TaskUpdate(BaseModel):
     new_end_date: Optional[str] = Field(None, description="New deadline/end date")
 
 
+class TaskPatch(BaseModel):
+    """
+    One entry of a batch update (PATCH /tasks).
+    Pick the tasks by task_id, task_name or a `where` filter, then apply `changes`.
+    """
+    task_id: Optional[Union[int, str]] = Field(None, description="Stable task id (preferred)")
+    task_name: Optional[str] = Field(None, description="Exact task name (case-insensitive)")
+    where: Optional[Dict[str, str]] = Field(None, description="Filters as in GET /tasks: status, assignee, client")
+    changes: Dict[str, Union[str, int]] = Field(..., description="Field -> new value, e.g. {\"status\": \"Closed\"}")
+
+
+class TaskBatchUpdate(BaseModel):
+    """Body of PATCH /tasks"""
+    updates: List[TaskPatch] = Field(..., min_length=1, max_length=500)
+
+
 class TaskResponse(BaseModel):
     """Model for task response"""
     task_name: str
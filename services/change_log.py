@@ -0,0 +1,115 @@
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from config import CHANGE_LOG_MAX_VERSIONS
+from services.task_store import add_snapshot_listener, parse_version_token, version_token
+
+# --- TASK CHANGE LOG ---
+# Every snapshot version bump is diffed against the previous snapshot and kept
+# in a bounded log, so clients can ask "what changed since version N?" and
+# receive only the added / updated / deleted tasks. Once N has been evicted
+# the answer is "refetch everything". Clients hold versions as epoch-qualified
+# tokens (task_store.version_token), so a cursor from before a restart or from
+# another worker's counter is never mistaken for one of ours.
+#
+# entry = {"from": old_version, "to": new_version, "added": [task], "updated": [task], "deleted": [task_id]}
+
+_lock = threading.Lock()
+_entries = deque(maxlen=CHANGE_LOG_MAX_VERSIONS)
+_change_listeners: List[Callable] = []  # called as listener(entry) after each entry is recorded
+
+
+def add_change_listener(listener: Callable) -> None:
+    """Register a callback that receives every new change-log entry"""
+    _change_listeners.append(listener)
+
+
+def task_key(task: Dict) -> str:
+    return str(task.get("task_id") or task.get("Task_Name") or "")
+
+
+def diff_tasks(old_tasks: List[Dict], new_tasks: List[Dict]) -> Dict:
+    """Added / updated tasks (full rows) and deleted task ids between two task lists"""
+    old_by_key = {task_key(t): t for t in old_tasks}
+    new_keys = set()
+    added, updated = [], []
+    for task in new_tasks:
+        key = task_key(task)
+        new_keys.add(key)
+        previous = old_by_key.get(key)
+        if previous is None:
+            added.append(task)
+        elif previous != task:
+            updated.append(task)
+    deleted = [key for key in old_by_key if key not in new_keys]
+    return {"added": added, "updated": updated, "deleted": deleted}
+
+
+def record_changes(old, new) -> None:
+    """Snapshot listener"""
+    entry = {"from": old.version, "to": new.version, **diff_tasks(old.tasks, new.tasks)}
+    with _lock:
+        _entries.append(entry)
+    for listener in _change_listeners:
+        try:
+            listener(entry)
+        except Exception as e:
+            print(f"❌ Change listener error: {e}")
+
+
+def get_changes_since(since: int, current_version: int) -> Dict:
+    """
+    Net changes from version `since` to `current_version`.
+    full_refetch=True when `since` is unknown (evicted, from the future, or mid-jump).
+    """
+    result = {"since": since, "version": current_version, "full_refetch": False,
+              "added": [], "updated": [], "deleted": []}
+    if since == current_version:
+        return result
+
+    with _lock:
+        entries = list(_entries)
+    start = next((i for i, e in enumerate(entries) if e["from"] == since), None)
+    if since > current_version or start is None:
+        result["full_refetch"] = True
+        return result
+
+    # Fold the entries into one net change per task
+    state: Dict[str, Tuple] = {}  # key -> ("added" | "updated", task) or ("deleted", None)
+    for entry in entries[start:]:
+        if entry["from"] >= current_version:
+            break
+        for task in entry["added"]:
+            previous = state.get(task_key(task))
+            state[task_key(task)] = ("updated", task) if previous and previous[0] == "deleted" else ("added", task)
+        for task in entry["updated"]:
+            previous = state.get(task_key(task))
+            state[task_key(task)] = ("added", task) if previous and previous[0] == "added" else ("updated", task)
+        for key in entry["deleted"]:
+            previous = state.get(key)
+            if previous and previous[0] == "added":
+                state.pop(key)  # Created and removed in between: the client never saw it
+            else:
+                state[key] = ("deleted", None)
+
+    for key, (kind, task) in state.items():
+        result[kind].append(key if kind == "deleted" else task)
+    return result
+
+
+def get_changes_since_token(since_token: Optional[str], current_version: int) -> Dict:
+    """
+    get_changes_since for a client cursor from version_token().
+    A token from another process / restart can't be compared with our versions: full_refetch.
+    """
+    since = parse_version_token(since_token)
+    if since is None:
+        result = {"since": since_token, "version": current_version, "full_refetch": True,
+                  "added": [], "updated": [], "deleted": []}
+    else:
+        result = {**get_changes_since(since, current_version), "since": since_token}
+    result["version_token"] = version_token(current_version)
+    return result
+
+
+add_snapshot_listener(record_changes)
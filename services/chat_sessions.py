@@ -0,0 +1,115 @@
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from config import (
+    CHAT_SESSION_MAX_SESSIONS, CHAT_SESSION_TTL_SECONDS,
+    CHAT_SESSION_RECENT_MESSAGES, CHAT_SUMMARY_MAX_TOKENS
+)
+from services.model_router import routed_completion
+
+# --- SERVER-SIDE CHAT SESSIONS ---
+# Each session keeps role-correct recent messages plus a rolling summary of
+# everything older. The summary and every message not yet folded into it are
+# sent to the model; compaction starts once more than 2 * RECENT messages are
+# pending, so prompt size stays bounded however long the conversation runs.
+#
+# session = {"id", "summary", "messages": [{"role", "content"}], "updated_at", "compacting"}
+
+_lock = threading.Lock()
+_sessions = OrderedDict()  # LRU: least recently used first
+_background_tasks = set()  # Keeps fire-and-forget compactions referenced until done
+
+_FALLBACK_SUMMARY_CHARS = 1500
+
+
+def _evict_expired() -> None:
+    now = time.time()
+    while _sessions:
+        oldest_id, oldest = next(iter(_sessions.items()))
+        if len(_sessions) > CHAT_SESSION_MAX_SESSIONS or now - oldest["updated_at"] > CHAT_SESSION_TTL_SECONDS:
+            _sessions.pop(oldest_id)
+        else:
+            break
+
+
+def get_or_create_session(session_id: Optional[str] = None) -> Dict:
+    """Returns the session for session_id, or a new one (unknown / expired ids start fresh)"""
+    with _lock:
+        _evict_expired()
+        session = _sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = {"id": session_id, "summary": "", "messages": [], "updated_at": time.time(), "compacting": False}
+            _sessions[session_id] = session
+        _sessions.move_to_end(session_id)
+        return session
+
+
+def get_session_context(session_id: str) -> Tuple[str, List[Dict]]:
+    """(rolling summary, recent messages) to put in front of the model"""
+    session = get_or_create_session(session_id)
+    with _lock:
+        return session["summary"], list(session["messages"])
+
+
+def record_exchange(session_id: str, user_message: str, assistant_message: str) -> None:
+    """Appends one user/assistant exchange; older messages are summarized in the background"""
+    session = get_or_create_session(session_id)
+    with _lock:
+        session["messages"].append({"role": "user", "content": str(user_message)})
+        session["messages"].append({"role": "assistant", "content": str(assistant_message)})
+        session["updated_at"] = time.time()
+        needs_compaction = len(session["messages"]) > 2 * CHAT_SESSION_RECENT_MESSAGES and not session["compacting"]
+        if needs_compaction:
+            session["compacting"] = True
+
+    if needs_compaction:
+        task = asyncio.get_running_loop().create_task(compact_session(session_id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def _fallback_summary(previous: str, messages: List[Dict]) -> str:
+    """Used when the LLM can't summarize: keep the tail of a plain transcript"""
+    transcript = " ".join(f"{m['role']}: {m['content'][:200]}" for m in messages)
+    return (f"{previous} {transcript}".strip())[-_FALLBACK_SUMMARY_CHARS:]
+
+
+async def compact_session(session_id: str) -> None:
+    """Folds everything but the most recent messages into the rolling summary"""
+    session = get_or_create_session(session_id)
+    with _lock:
+        older = session["messages"][:-CHAT_SESSION_RECENT_MESSAGES]
+        previous_summary = session["summary"]
+    if not older:
+        session["compacting"] = False
+        return
+
+    transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in older)
+    try:
+        response = await routed_completion(
+            "session_summary",
+            messages=[
+                {"role": "system", "content": (
+                    "You maintain a running summary of a project-management chat. "
+                    "Keep decisions, task names, dates, people and open questions. Be brief."
+                )},
+                {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+            ],
+            temperature=0.1,
+            max_tokens=CHAT_SUMMARY_MAX_TOKENS
+        )
+        new_summary = response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"❌ Session summary failed, truncating instead: {e}")
+        new_summary = _fallback_summary(previous_summary, older)
+
+    with _lock:
+        # Messages recorded while we were summarizing stay in the recent window
+        session["messages"] = session["messages"][len(older):]
+        session["summary"] = new_summary
+        session["compacting"] = False
+    print(f"🧠 Session {session_id[:8]} compacted {len(older)} messages", flush=True)
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Dict, List, Optional
+from services.kpis import compute_kpis, get_kpis
+from services.mermaid import generate_mermaid_flowchart, generate_mermaid_gantt
+from services.task_query import filter_tasks, project_tasks
+from services.task_store import TaskSnapshot
+
+# --- DASHBOARD BUNDLE ---
+# Everything the dashboard shows on load, built from one task snapshot so the
+# parts always agree with each other: tasks, KPIs, the client list and
+# (optionally) Mermaid diagrams. The independent parts are computed
+# concurrently in worker threads.
+
+DIAGRAMS = {"gantt": generate_mermaid_gantt, "flowchart": generate_mermaid_flowchart}
+
+
+def list_clients(tasks: List[Dict]) -> List[str]:
+    """Distinct non-empty client names, alphabetical"""
+    return sorted({str(t.get("Client", "")).strip() for t in tasks} - {""}, key=str.lower)
+
+
+async def build_dashboard(
+    snapshot: TaskSnapshot,
+    fields: Optional[str] = None,
+    client: Optional[str] = None,
+    diagrams: Optional[List[str]] = None
+) -> Dict:
+    """
+    {"tasks", "kpis", "clients", "diagrams"} for one snapshot.
+    client narrows tasks, KPIs and diagrams; the client list always covers every task.
+    Raises ValueError for unknown fields or diagram types.
+    """
+    unknown = [name for name in diagrams or [] if name not in DIAGRAMS]
+    if unknown:
+        raise ValueError(f"Unknown diagrams: {', '.join(unknown)}. Allowed: {', '.join(DIAGRAMS)}")
+
+    tasks = filter_tasks(snapshot.tasks, client=client) if client else snapshot.tasks
+    projected, unknown_fields = project_tasks(tasks, fields)
+    if unknown_fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown_fields)}")
+
+    jobs = {
+        # Whole-snapshot KPIs come from the shared per-version cache
+        "kpis": asyncio.to_thread(compute_kpis, tasks) if client else asyncio.to_thread(lambda: get_kpis(snapshot)[0]),
+        "clients": asyncio.to_thread(list_clients, snapshot.tasks),
+    }
+    for name in diagrams or []:
+        jobs[name] = asyncio.to_thread(DIAGRAMS[name], tasks)
+    results = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+
+    return {
+        "tasks": projected,
+        "kpis": results.pop("kpis"),
+        "clients": results.pop("clients"),
+        "diagrams": results,
+    }
@@ -0,0 +1,206 @@
+import time
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from jinja2 import Environment
+from config import DIGEST_INTERVAL_HOURS, DIGEST_RECIPIENTS, DIGEST_MIN_INTERVAL_SECONDS, DIGEST_MAX_EVENTS, KPI_DUE_SOON_DAYS
+from services.email_service import BREVO_API_KEY, DEFAULT_ADMIN_EMAIL
+from services.email_outbox import queue_email
+from services.google_sheets_service import CLOSED_STATUSES, find_schedule_conflicts
+from services.task_index import get_task_index
+from services.task_store import add_snapshot_listener, get_task_snapshot
+from services import shared_cache
+from services.shared_cache import claim_once, hold_lease
+
+# --- DIGEST EMAILS ---
+# Status changes seen by the sync layer are collected per recipient between
+# digests. On each run every recipient gets at most one email combining those
+# changes, their tasks due soon and schedule conflicts that are new since the
+# last digest. Assignees are mapped to addresses with DIGEST_RECIPIENTS; the
+# admin address receives everything. A recipient is emailed at most once per
+# DIGEST_MIN_INTERVAL_SECONDS. Skipped recipients keep their events for the next run.
+# With several workers the pending events, send times and reported conflicts
+# live in the shared cache (under the "digest" lease), and each snapshot
+# version's changes are recorded by one worker only, so whichever worker wins
+# the scheduled run sends everything every worker saw.
+
+_DIGEST_TEMPLATE = """
+<html>
+<body>
+    <h3>Project digest &mdash; {{ today }}</h3>
+    {% if status_changes %}
+    <h4>🔄 Status changes</h4>
+    <ul>{% for e in status_changes %}<li><b>{{ e.task }}</b>: {{ e.old or "new" }} &rarr; {{ e.new }}</li>{% endfor %}</ul>
+    {% endif %}
+    {% if due_soon %}
+    <h4>📅 Due in the next {{ due_days }} days</h4>
+    <ul>{% for t in due_soon %}<li><b>{{ t.Task_Name }}</b> &mdash; {{ t.end_date }} ({{ t.status }}{% if t.assigned_to %}, {{ t.assigned_to }}{% endif %})</li>{% endfor %}</ul>
+    {% endif %}
+    {% if conflicts %}
+    <h4>⚠️ New schedule conflicts</h4>
+    <ul>{% for c in conflicts %}<li><b>{{ c.task }}</b> starts {{ c.start_date }}, before <b>{{ c.predecessor }}</b> ends ({{ c.predecessor_end }})</li>{% endfor %}</ul>
+    {% endif %}
+    <br>
+    <hr>
+    <small>Sent via AI Project Assistant</small>
+</body>
+</html>
+"""
+
+# Compiled once per process
+_template = Environment(autoescape=True).from_string(_DIGEST_TEMPLATE)
+
+_lock = threading.Lock()
+# pending: { email: [status change events] }, last_sent: { email: epoch of the last digest },
+# reported: { email: [conflict keys already sent] }
+_state = {"pending": {}, "last_sent": {}, "reported": {}}
+
+
+@contextmanager
+def _digest_state():
+    """
+    The digest state for read-modify-write; shared across workers when the shared cache is on.
+    Yields None when another worker kept the lease past the wait, so callers skip instead of racing it.
+    """
+    with _lock:
+        if not shared_cache.is_enabled():
+            yield _state
+            return
+        with hold_lease("digest", ttl=10, wait=10) as held:
+            if not held:
+                print("❌ Digest state is locked by another worker, skipping")
+                yield None
+                return
+            state = shared_cache.get_value("digest") or {"pending": {}, "last_sent": {}, "reported": {}}
+            yield state
+            shared_cache.put_value("digest", state)
+
+
+def _recipients_for(assignee: str) -> List[str]:
+    """Assignee's address (if mapped) plus the admin's"""
+    emails = []
+    mapped = DIGEST_RECIPIENTS.get(str(assignee or "").strip().lower())
+    if mapped:
+        emails.append(mapped)
+    if DEFAULT_ADMIN_EMAIL and DEFAULT_ADMIN_EMAIL not in emails:
+        emails.append(DEFAULT_ADMIN_EMAIL)
+    return emails
+
+
+def collect_status_changes(old, new) -> None:
+    """Snapshot listener: queue status changes for the affected recipients"""
+    if old.version == 0:
+        return  # First load after startup, nothing to compare against
+    previous = {str(t.get("task_id")): t for t in old.tasks}
+    changes = []
+    for task in new.tasks:
+        before = previous.get(str(task.get("task_id")))
+        old_status = str(before.get("status", "")).strip() if before else None
+        new_status = str(task.get("status", "")).strip()
+        if old_status != new_status:
+            changes.append((task, {"task": task.get("Task_Name", ""), "old": old_status, "new": new_status}))
+    if not changes:
+        return
+    with _digest_state() as state:
+        # Claimed only with the state in hand, so a skipped worker leaves the version to the others
+        if state is None or not claim_once(f"digest:v{new.version}"):
+            return  # Another worker already recorded this version's changes
+        for task, event in changes:
+            for email in _recipients_for(task.get("assigned_to")):
+                events = state["pending"].setdefault(email, [])
+                events.append(event)
+                del events[:-DIGEST_MAX_EVENTS]
+
+
+def _conflict_key(conflict: Dict) -> list:
+    # A list so it round-trips through the shared cache's JSON unchanged
+    return [str(conflict[k]) for k in ("task", "predecessor", "start_date", "predecessor_end")]
+
+
+def build_digests(
+    tasks: List[Dict],
+    today: Optional[date] = None,
+    state: Optional[Dict] = None,
+    conflicts: Optional[List[Dict]] = None
+) -> Dict[str, Dict]:
+    """{email: template context} for every recipient with something to report"""
+    if state is None:
+        with _digest_state() as state:
+            return build_digests(tasks, today, state, conflicts) if state is not None else {}
+    today = today or date.today()
+    contexts = defaultdict(lambda: {"status_changes": [], "due_soon": [], "conflicts": []})
+
+    for email, events in state["pending"].items():
+        contexts[email]["status_changes"] = list(events)
+
+    due = get_task_index(tasks).due_between(today, today + timedelta(days=KPI_DUE_SOON_DAYS))
+    for task in due:
+        if str(task.get("status", "")).strip().lower() in CLOSED_STATUSES:
+            continue
+        for email in _recipients_for(task.get("assigned_to")):
+            contexts[email]["due_soon"].append(task)
+
+    for conflict in find_schedule_conflicts(tasks) if conflicts is None else conflicts:
+        for email in _recipients_for(conflict["assigned_to"]):
+            if _conflict_key(conflict) not in state["reported"].get(email, []):
+                contexts[email]["conflicts"].append(conflict)
+
+    return {email: ctx for email, ctx in contexts.items() if any(ctx.values())}
+
+
+def send_digests(dry_run: bool = False) -> Dict:
+    """Render and queue one digest per recipient (respecting the per-recipient interval)"""
+    if not BREVO_API_KEY and not dry_run:
+        return {"queued": [], "rate_limited": [], "error": "BREVO_API_KEY is missing."}
+
+    tasks = get_task_snapshot().tasks
+    today = date.today()
+    now = time.time()
+    queued, rate_limited = [], []
+
+    conflicts = find_schedule_conflicts(tasks)
+    # Held for the whole run so changes recorded meanwhile wait for the next digest
+    with _digest_state() as state:
+        if state is None:
+            return {"queued": [], "rate_limited": [], "error": "Digest state is locked by another worker; retried next run."}
+        for email, context in build_digests(tasks, today, state, conflicts).items():
+            if now - state["last_sent"].get(email, 0) < DIGEST_MIN_INTERVAL_SECONDS:
+                rate_limited.append(email)
+                continue
+            subject = f"Project digest {today.isoformat()}"
+            html = _template.render(today=today.isoformat(), due_days=KPI_DUE_SOON_DAYS, **context)
+            counts = {name: len(items) for name, items in context.items()}
+            if not dry_run:
+                message = queue_email(subject, f"{subject}: {counts}", email, html_content=html)
+                state["last_sent"][email] = now
+                reported = state["reported"].setdefault(email, [])
+                reported.extend(_conflict_key(c) for c in context["conflicts"])
+                del state["pending"].get(email, [])[:len(context["status_changes"])]
+                queued.append({"recipient": email, "id": message["id"], **counts})
+            else:
+                queued.append({"recipient": email, **counts})
+
+        if not dry_run:
+            # Only conflicts that still exist need remembering; resolved ones would grow the state forever
+            current = [_conflict_key(c) for c in conflicts]
+            for email, reported in list(state["reported"].items()):
+                kept = [key for key in reported if key in current]
+                if kept:
+                    state["reported"][email] = kept
+                else:
+                    del state["reported"][email]
+
+    print(f"📬 Digests {'previewed' if dry_run else 'queued'}: {len(queued)}, rate limited: {len(rate_limited)}", flush=True)
+    return {"queued": queued, "rate_limited": rate_limited}
+
+
+def run_scheduled_digests() -> None:
+    """Scheduler entry point: with several workers only one sends each interval's digests"""
+    slot = int(time.time() // (DIGEST_INTERVAL_HOURS * 3600))
+    if claim_once(f"digest:{slot}"):
+        send_digests()
+
+
+add_snapshot_listener(collect_status_changes)
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import queue
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from sib_api_v3_sdk.rest import ApiException
+from config import (
+    EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS, EMAIL_DEDUP_WINDOW_SECONDS, EMAIL_OUTBOX_MAX_MESSAGES,
+    EMAIL_OUTBOX_PATH
+)
+from services.email_service import BREVO_API_KEY, build_email, get_transactional_api
+
+# --- EMAIL OUTBOX ---
+# Chat tools and digests enqueue emails and return immediately; one background
+# thread sends them through the shared Brevo client, retrying rate limits and
+# server / network errors with exponential backoff. The same recipient + subject
+# + body within EMAIL_DEDUP_WINDOW_SECONDS is sent once.
+# Every message is also stored in a SQLite file (EMAIL_OUTBOX_PATH), so queued
+# emails and their status survive a restart. An unsent email is leased to the
+# worker sending it, which keeps renewing the lease; emails whose lease ran out
+# (the worker crashed or restarted) are taken over by the next sweep of any
+# worker sharing the file. An empty EMAIL_OUTBOX_PATH keeps the outbox in memory
+# only, and the tool reply says so.
+#
+# message = {"id", "recipient", "subject", "status": queued|sending|sent|failed,
+#            "attempts", "error", "created_at", "sent_at"}
+
+_lock = threading.Lock()
+_messages = OrderedDict()  # { id: message }, oldest first
+_payloads = {}             # { id: SendSmtpEmail } until sent or failed
+_dedup = {}                # { content hash: (id, queued_at) }
+_queue = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_stats = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "deduplicated": 0, "recovered": 0}
+_LEASE_SECONDS = 60  # How long an unsent email stays with its worker without a renewal
+_SWEEP_SECONDS = 30
+_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_local = threading.local()
+
+
+def is_persistent() -> bool:
+    return bool(EMAIL_OUTBOX_PATH)
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(EMAIL_OUTBOX_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY, email TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL,
+                error TEXT, created_at REAL NOT NULL, sent_at REAL, owner TEXT NOT NULL, lease_until REAL NOT NULL
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+
+def _persist_new(message: Dict, email: Dict) -> None:
+    _db().execute(
+        "INSERT INTO outbox (id, email, status, attempts, error, created_at, sent_at, owner, lease_until) "
+        "VALUES (?, ?, ?, 0, NULL, ?, NULL, ?, ?)",
+        (message["id"], json.dumps(email), message["status"], message["created_at"], _OWNER, time.time() + _LEASE_SECONDS)
+    )
+    # Keep the file bounded like the in-memory outbox: drop the oldest finished messages
+    _db().execute(
+        "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND id NOT IN "
+        "(SELECT id FROM outbox ORDER BY created_at DESC LIMIT ?)",
+        (EMAIL_OUTBOX_MAX_MESSAGES,)
+    )
+
+
+def _persist_update(message: Dict, lease_seconds: float = _LEASE_SECONDS) -> bool:
+    """Store the message's state and extend its lease; False if another worker has taken it over"""
+    cursor = _db().execute(
+        "UPDATE outbox SET status = ?, attempts = ?, error = ?, sent_at = ?, lease_until = ? WHERE id = ? AND owner = ?",
+        (message["status"], message["attempts"], message["error"], message["sent_at"],
+         time.time() + lease_seconds, message["id"], _OWNER)
+    )
+    return cursor.rowcount == 1
+
+
+def _content_hash(recipient: str, subject: str, body: str) -> str:
+    return hashlib.sha1(f"{recipient}\n{subject}\n{body}".encode("utf-8")).hexdigest()
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_run_worker, name="email-outbox", daemon=True)
+        _worker.start()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ApiException):
+        return error.status in (None, 0, 429) or (error.status or 0) >= 500
+    return True  # Connection / timeout errors from the HTTP layer
+
+
+def _deliver(message_id: str) -> None:
+    with _lock:
+        message = _messages.get(message_id)
+        payload = _payloads.get(message_id)
+        if message is None or payload is None:
+            return
+        message["status"] = "sending"
+        message["attempts"] += 1
+
+    if is_persistent() and not _persist_update(message):
+        with _lock:
+            message.update({"status": "queued", "error": "Handed over to another worker"})
+            _payloads.pop(message_id, None)
+        return
+
+    try:
+        get_transactional_api().send_transac_email(payload)
+    except Exception as e:
+        with _lock:
+            message["error"] = str(e)[:300]
+            if message["attempts"] < EMAIL_MAX_ATTEMPTS and _is_retryable(e):
+                message["status"] = "queued"
+                _stats["retried"] += 1
+                delay = EMAIL_RETRY_BASE_SECONDS * 2 ** (message["attempts"] - 1) * (1 + random.random() / 2)
+            else:
+                message["status"] = "failed"
+                _stats["failed"] += 1
+                _payloads.pop(message_id, None)
+                delay = None
+        print(f"❌ Email {message_id} attempt {message['attempts']} failed: {e}", flush=True)
+        if is_persistent():
+            _persist_update(message, (delay or 0) + _LEASE_SECONDS)
+        if delay is not None:
+            timer = threading.Timer(delay, _queue.put, args=(message_id,))
+            timer.daemon = True
+            timer.start()
+        return
+
+    with _lock:
+        message.update({"status": "sent", "error": None, "sent_at": time.time()})
+        _payloads.pop(message_id, None)
+        _stats["sent"] += 1
+    if is_persistent():
+        _persist_update(message)
+    print(f"📨 Email {message_id} sent to {message['recipient']}", flush=True)
+
+
+def _recover_expired() -> None:
+    """Queue the persisted emails no live worker is looking after"""
+    adopted = _db().execute(
+        "UPDATE outbox SET owner = ?, status = 'queued', lease_until = ? "
+        "WHERE status IN ('queued', 'sending') AND lease_until < ? RETURNING id, email, attempts, error, created_at",
+        (_OWNER, time.time() + _LEASE_SECONDS, time.time())
+    ).fetchall()
+    for message_id, email, attempts, error, created_at in adopted:
+        email = json.loads(email)
+        with _lock:
+            _messages[message_id] = {
+                "id": message_id, "recipient": email["recipient"], "subject": email["subject"], "status": "queued",
+                "attempts": attempts, "error": error, "created_at": created_at, "sent_at": None,
+            }
+            _payloads[message_id] = build_email(email["subject"], email["email_body"], email["recipient"], email["html_content"])
+            _stats["recovered"] += 1
+        _queue.put(message_id)
+    if adopted:
+        print(f"♻️ Recovered {len(adopted)} unsent emails from the outbox", flush=True)
+
+
+def _run_worker() -> None:
+    while True:
+        try:
+            if is_persistent():
+                try:
+                    message_id = _queue.get(timeout=_SWEEP_SECONDS)
+                except queue.Empty:
+                    _recover_expired()
+                    continue
+            else:
+                message_id = _queue.get()
+            _deliver(message_id)
+        except Exception as e:
+            print(f"❌ Email outbox worker error: {e}")
+
+
+def start_outbox() -> None:
+    """Startup hook: with a persistent outbox, resume emails left unsent by a previous run"""
+    if is_persistent():
+        _ensure_worker()
+
+
+def queue_email(subject: str, email_body: str, recipient_email: str = None, html_content: str = None) -> Dict:
+    """Enqueue an email; returns its message record (an existing one for duplicates)"""
+    payload = build_email(subject, email_body, recipient_email, html_content)
+    recipient = payload.to[0]["email"]
+    content_hash = _content_hash(recipient, subject, html_content or email_body)
+    now = time.time()
+
+    with _lock:
+        existing = _dedup.get(content_hash)
+        if existing and now - existing[1] < EMAIL_DEDUP_WINDOW_SECONDS:
+            message = _messages.get(existing[0])
+            if message and message["status"] != "failed":
+                _stats["deduplicated"] += 1
+                return dict(message, deduplicated=True)
+
+        message_id = uuid.uuid4().hex[:12]
+        message = {
+            "id": message_id, "recipient": recipient, "subject": subject, "status": "queued",
+            "attempts": 0, "error": None, "created_at": now, "sent_at": None,
+        }
+        _messages[message_id] = message
+        _payloads[message_id] = payload
+        _dedup[content_hash] = (message_id, now)
+        _stats["queued"] += 1
+        if is_persistent():
+            email = {"recipient": recipient, "subject": subject, "email_body": email_body, "html_content": html_content}
+            _persist_new(message, email)
+
+        # Keep the outbox bounded: forget the oldest finished messages
+        while len(_messages) > EMAIL_OUTBOX_MAX_MESSAGES:
+            oldest_id = next(iter(_messages))
+            if _messages[oldest_id]["status"] in ("queued", "sending"):
+                break
+            _messages.pop(oldest_id)
+        for key in [k for k, (_, queued_at) in _dedup.items() if now - queued_at >= EMAIL_DEDUP_WINDOW_SECONDS]:
+            _dedup.pop(key)
+
+    _ensure_worker()
+    _queue.put(message_id)
+    return dict(message)
+
+
+def queue_project_email(subject: str, email_body: str, recipient_email: str = None) -> str:
+    """Chat tool: enqueue and answer right away (never waits on Brevo)"""
+    if not BREVO_API_KEY:
+        return "❌ Error: BREVO_API_KEY is missing."
+    message = queue_email(subject, email_body, recipient_email)
+    if message.get("deduplicated"):
+        return f"📨 That email to {message['recipient']} is already {message['status']} (id {message['id']})."
+    if not is_persistent():
+        # In-memory outbox: say so rather than promise a delivery a restart would lose
+        return f"📨 Email to {message['recipient']} queued (id {message['id']}); it is sent in the background and is lost if the server restarts first."
+    return f"📨 Email to {message['recipient']} queued (id {message['id']})."
+
+
+def get_email_status(message_id: str) -> Optional[Dict]:
+    """This worker's record, else the stored one (sent by another worker or before a restart)"""
+    with _lock:
+        message = _messages.get(message_id)
+        if message:
+            return dict(message)
+    if not is_persistent():
+        return None
+    row = _db().execute(
+        "SELECT email, status, attempts, error, created_at, sent_at FROM outbox WHERE id = ?", (message_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    email = json.loads(row[0])
+    return {
+        "id": message_id, "recipient": email["recipient"], "subject": email["subject"], "status": row[1],
+        "attempts": row[2], "error": row[3], "created_at": row[4], "sent_at": row[5],
+    }
+
+
+def get_outbox_stats() -> Dict:
+    with _lock:
+        pending = sum(1 for m in _messages.values() if m["status"] in ("queued", "sending"))
+        return {**_stats, "pending": pending}
@@ -7,29 +7,33 @@ BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 DEFAULT_ADMIN_EMAIL = os.getenv("DEFAULT_ADMIN_EMAIL")
 
-def send_email_via_brevo(subject: str, email_body: str, recipient_email: str = None) -> str:
-    """
-    Sends an email using Brevo API.
-    """
-    if not BREVO_API_KEY:
-        return "❌ Error: BREVO_API_KEY is missing."
+_api_instance = None
 
+
+def get_transactional_api():
+    """One TransactionalEmailsApi (and its connection pool) for the whole process"""
+    global _api_instance
+    if _api_instance is None:
+        # Configure API key authorization
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = BREVO_API_KEY
+        _api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+    return _api_instance
+
+
+def build_email(subject: str, email_body: str, recipient_email: str = None, html_content: str = None):
+    """SendSmtpEmail for one recipient; falls back to DEFAULT_ADMIN_EMAIL"""
     # If AI doesn't provide a recipient, use the default admin
     if not recipient_email:
         recipient_email = DEFAULT_ADMIN_EMAIL
 
-    # Configure API key authorization
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = BREVO_API_KEY
-
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-
     # Create Email Object
     sender = {"name": "AI Project Manager", "email": SENDER_EMAIL}
     to = [{"email": recipient_email}]
     
     # We use HTML content for better formatting
-    html_content = f"""
+    if html_content is None:
+        html_content = f"""
     <html>
     <body>
         <h3>{subject}</h3>
@@ -41,15 +45,26 @@ def send_email_via_brevo(subject: str, email_body: str, recipient_email: str = N
     </html>
     """
 
-    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+    return sib_api_v3_sdk.SendSmtpEmail(
         to=to,
         sender=sender,
         subject=subject,
         html_content=html_content
     )
 
+
+def send_email_via_brevo(subject: str, email_body: str, recipient_email: str = None) -> str:
+    """
+    Sends an email using Brevo API (blocking; the chat tool goes through the outbox instead).
+    """
+    if not BREVO_API_KEY:
+        return "❌ Error: BREVO_API_KEY is missing."
+
+    send_smtp_email = build_email(subject, email_body, recipient_email)
+    recipient_email = send_smtp_email.to[0]["email"]
+
     try:
-        api_response = api_instance.send_transac_email(send_smtp_email)
+        get_transactional_api().send_transac_email(send_smtp_email)
         return f"✅ Email sent successfully to {recipient_email}."
     except ApiException as e:
         print(f"❌ Brevo Error: {e}")
@@ -1,13 +1,16 @@
 import json
+import time
 import gspread
 import os
+from gspread.utils import rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
-from config import GOOGLE_SHEETS_CREDENTIALS, SPREADSHEET_ID
+from config import GOOGLE_SHEETS_CREDENTIALS, SPREADSHEET_ID, SHEET_HEADER_TTL_SECONDS
 from models.schemas import TaskInput, TaskUpdate
 from typing import List, Dict, Optional
 #from datetime import datetime
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import Counter
+from services.task_store import invalidate_task_snapshot
 
 # Initialize Google Sheets connection
 def get_google_sheet():
@@ -46,18 +49,76 @@ def get_google_sheet():
         print(f"❌ Connection Error: {e}")
         return None
 
-def fetch_all_tasks() -> List[Dict]:
-    """Retrieve all tasks from Google Sheets"""
+def read_all_tasks() -> Optional[List[Dict]]:
+    """All tasks from Google Sheets, or None if the sheet couldn't be read (unlike an empty sheet)"""
     try:
         worksheet = get_google_sheet()
         if not worksheet:
-            return []
+            return None
         
         all_records = worksheet.get_all_records()
         return all_records if all_records else []
     except Exception as e:
         print(f"❌ Error fetching tasks: {e}")
-        return []
+        return None
+
+def fetch_all_tasks() -> List[Dict]:
+    """Retrieve all tasks from Google Sheets"""
+    return read_all_tasks() or []
+
+# --- TARGETED READS ---
+# Lookups read only the columns they need (col_values / batch_get) instead of
+# the whole sheet. Header positions are cached; every read checks that each
+# column still starts with the expected header and re-reads the header row once
+# if the columns have moved.
+
+_header_cache = {"headers": [], "fetched_at": 0.0}
+
+
+def get_sheet_headers(worksheet, refresh: bool = False) -> List[str]:
+    """Header row, cached for SHEET_HEADER_TTL_SECONDS"""
+    if refresh or not _header_cache["headers"] or time.time() - _header_cache["fetched_at"] > SHEET_HEADER_TTL_SECONDS:
+        _header_cache.update(headers=worksheet.row_values(1), fetched_at=time.time())
+    return _header_cache["headers"]
+
+
+def read_column(worksheet, header: str) -> List:
+    """Values of one column below the header (one col_values request)"""
+    for refresh in (False, True):
+        headers = get_sheet_headers(worksheet, refresh)
+        if header in headers:
+            values = worksheet.col_values(headers.index(header) + 1)
+            if values and values[0] == header:
+                return values[1:]
+    raise KeyError(f"Column '{header}' not found in the sheet")
+
+
+def read_columns(worksheet, names: List[str]) -> Dict[str, List]:
+    """
+    Several columns in one batch_get request: {header: values below the header}.
+    Column positions are in _header_cache afterwards (verified by this read).
+    """
+    for refresh in (False, True):
+        headers = get_sheet_headers(worksheet, refresh)
+        if not all(name in headers for name in names):
+            continue
+        letters = [rowcol_to_a1(1, headers.index(name) + 1)[:-1] for name in names]
+        value_ranges = worksheet.batch_get([f"{letter}1:{letter}" for letter in letters], major_dimension="COLUMNS")
+        columns = {name: (values[0] if values else []) for name, values in zip(names, value_ranges)}
+        if all(column and column[0] == name for name, column in columns.items()):
+            return {name: column[1:] for name, column in columns.items()}
+    missing = [name for name in names if name not in _header_cache["headers"]]
+    raise KeyError(f"Columns {missing or names} not found in the sheet")
+
+
+def find_row_by_name(names: List, task_name: str) -> int:
+    """Sheet row of the first Task_Name match (case-insensitive), -1 if none"""
+    target = task_name.strip().lower()
+    for idx, name in enumerate(names):
+        if str(name).strip().lower() == target:
+            return idx + 2  # +2 because sheet is 1-indexed and has header row
+    return -1
+
 
 def add_task_to_sheet(task: TaskInput, successor: str = "") -> Dict:
     """
@@ -71,26 +132,12 @@ def add_task_to_sheet(task: TaskInput, successor: str = "") -> Dict:
         if not worksheet:
             return {"success": False, "error": "Could not connect to Google Sheets"}
         
-        # 1. Fetch all existing records to calculate the next ID
-        all_records = worksheet.get_all_records()
+        # 1. Fetch only the task_id column to calculate the next ID
+        task_ids = read_column(worksheet, "task_id")
         
-        # 2. Calculate Next ID
-        if not all_records:
-            next_id = 1
-        else:
-            existing_ids = []
-            for record in all_records:
-                # Safely extract IDs (handling potential strings/empty cells)
-                try:
-                    # Assumes task_id is the first column (key: 'task_id')
-                    # Adjust key string if your header is different, e.g., 'ID'
-                    tid = record.get("task_id", 0) 
-                    if str(tid).isdigit():
-                        existing_ids.append(int(tid))
-                except (ValueError, TypeError):
-                    continue
-            
-            next_id = (max(existing_ids) + 1) if existing_ids else 1
+        # 2. Calculate Next ID (skipping empty / non-numeric cells)
+        existing_ids = [int(tid) for tid in task_ids if str(tid).strip().isdigit()]
+        next_id = (max(existing_ids) + 1) if existing_ids else 1
         
         # 3. Build the new row
         # Order: ID | Name | Start | End | Status | Assigned | Client | Priority | Successor
@@ -107,6 +154,7 @@ def add_task_to_sheet(task: TaskInput, successor: str = "") -> Dict:
         ]
         
         worksheet.append_row(new_row)
+        invalidate_task_snapshot()
         
         return {
             "success": True, 
@@ -117,13 +165,15 @@ def add_task_to_sheet(task: TaskInput, successor: str = "") -> Dict:
         print(f"❌ Error adding task: {e}")
         return {"success": False, "error": str(e)}
 
-def find_task_id_by_name(partial_name: str) -> str:
+def find_task_id_by_name(partial_name: str, tasks: Optional[List[Dict]] = None) -> str:
     """
     Searches for a task by name and returns its Task ID.
     Returns empty string if not found.
+    Pass `tasks` to search an already-fetched snapshot instead of re-reading the sheet.
     """
     try:
-        tasks = fetch_all_tasks() # Re-use your existing fetch function
+        if tasks is None:
+            tasks = fetch_all_tasks() # Re-use your existing fetch function
         if not tasks:
             return ""
 
@@ -144,11 +194,13 @@ def find_task_id_by_name(partial_name: str) -> str:
 
 #----- New AI Wrapper function
 def add_task_from_ai(task_name: str, assigned_to: str = "Unassigned", priority: str = "Medium", 
-                     end_date: str = "", client: str = "Unknown", predecessor_name: str = "") -> str:
+                     end_date: str = "", client: str = "Unknown", predecessor_name: str = "",
+                     tasks: Optional[List[Dict]] = None) -> str:
     """
     Smart Wrapper: 
     1. Resolves predecessor name to ID.
     2. Auto-calculates start_date based on predecessor's end_date (if applicable).
+    `tasks` is the caller's snapshot, used for the predecessor lookup.
     """
     try:
         # Defaults
@@ -158,13 +210,15 @@ def add_task_from_ai(task_name: str, assigned_to: str = "Unassigned", priority:
         # --- SMART LOGIC: Handle Predecessor ---
         if predecessor_name:
             # 1. Find the ID
-            found_id = find_task_id_by_name(predecessor_name)
+            if tasks is None:
+                tasks = fetch_all_tasks()
+            found_id = find_task_id_by_name(predecessor_name, tasks)
             
             if found_id:
                 predecessor_id = found_id
                 
-                # 2. Smart Scheduling: Fetch the predecessor task to get its End Date
-                all_tasks = fetch_all_tasks()
+                # 2. Smart Scheduling: Look up the predecessor task to get its End Date
+                all_tasks = tasks
                 parent_task = next((t for t in all_tasks if str(t.get("task_id")) == found_id), None)
                 
                 if parent_task:
@@ -196,7 +250,7 @@ def add_task_from_ai(task_name: str, assigned_to: str = "Unassigned", priority:
         result = add_task_to_sheet(new_task_input)
         
         if result["success"]:
-            msg = f"✅ Added '{task_name}' (ID: {result['id']})"
+            msg = f"✅ Added '{task_name}' (ID: {result['task_id']})"
             if predecessor_id:
                 msg += f" linked to predecessor ID {predecessor_id}."
             return msg
@@ -206,15 +260,11 @@ def add_task_from_ai(task_name: str, assigned_to: str = "Unassigned", priority:
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
-def check_schedule_conflicts() -> str:
+def find_schedule_conflicts(tasks: List[Dict]) -> List[Dict]:
     """
-    Scans all tasks to ensure that if Task B depends on Task A,
-    Task B starts AFTER Task A ends.
+    Tasks that start before their predecessor ends:
+    [{"task", "assigned_to", "start_date", "predecessor", "predecessor_end"}]
     """
-    tasks = fetch_all_tasks()
-    if not tasks:
-        return "No tasks to analyze."
-
     # 1. Build a lookup map for speed { "task_id": task_object }
     task_map = {str(t.get("task_id")): t for t in tasks}
     conflicts = []
@@ -238,12 +288,33 @@ def check_schedule_conflicts() -> str:
                     
                     # LOGIC: Conflict if Child starts BEFORE Parent ends
                     if c_start_dt < p_end_dt:
-                        conflicts.append(
-                            f"⚠️ CONFLICT: Task '{task['Task_Name']}' starts on {child_start}, "
-                            f"but its predecessor '{parent['Task_Name']}' doesn't end until {parent_end}."
-                        )
+                        conflicts.append({
+                            "task": task['Task_Name'],
+                            "assigned_to": task.get("assigned_to", ""),
+                            "start_date": child_start,
+                            "predecessor": parent['Task_Name'],
+                            "predecessor_end": parent_end,
+                        })
                 except ValueError:
                     continue # Skip invalid dates
+    return conflicts
+
+
+def check_schedule_conflicts(tasks: Optional[List[Dict]] = None) -> str:
+    """
+    Scans all tasks to ensure that if Task B depends on Task A,
+    Task B starts AFTER Task A ends.
+    """
+    if tasks is None:
+        tasks = fetch_all_tasks()
+    if not tasks:
+        return "No tasks to analyze."
+
+    conflicts = [
+        f"⚠️ CONFLICT: Task '{c['task']}' starts on {c['start_date']}, "
+        f"but its predecessor '{c['predecessor']}' doesn't end until {c['predecessor_end']}."
+        for c in find_schedule_conflicts(tasks)
+    ]
 
     if not conflicts:
         return "✅ Schedule is healthy! No dependency conflicts found."
@@ -258,25 +329,17 @@ def update_task_status(update: TaskUpdate) -> bool:
         if not worksheet:
             return False
         
-        all_records = worksheet.get_all_records()
-        
-        # 1. Clean the incoming name (Remove leading/trailing spaces & lower case)
-        target_name_clean = update.task_name.strip().lower()
-        
-        # Find and update the task
-        for idx, record in enumerate(all_records, start=2):  # Start from row 2 (after header)
-            
-            # 2. Get the name using the correct key (likely 'Task_Name') 
-            # and clean it (strip spaces)
-            sheet_task_name = str(record.get("Task_Name", record.get("Task Name", ""))).strip().lower()
-            
-            if sheet_task_name == target_name_clean:
-                # 3. Update Column 5 (Status)
-                # Based on your order: Task(2), Start(3), End(4), Status(5)
-                worksheet.update_cell(idx, 5, update.new_status) 
-                return True
-        
-        return False
+        # 1. Read only the Task_Name and status columns to find the row
+        columns = read_columns(worksheet, ["Task_Name", "status"])
+        row = find_row_by_name(columns["Task_Name"], update.task_name)
+        if row == -1:
+            return False
+
+        # 2. Update the status cell (position verified by the read above)
+        status_col = get_sheet_headers(worksheet).index("status") + 1
+        worksheet.update_cell(row, status_col, update.new_status)
+        invalidate_task_snapshot()
+        return True
     except Exception as e:
         print(f"❌ Error updating task: {e}")
         return False
@@ -315,38 +378,22 @@ def update_task_field(task_name: str, field_type: str, new_value: str, request_a
         if field_type not in COLUMN_MAPPING:
             return {"success": False, "message": f"❌ Error: Field '{field_type}' is invalid."}
         target_header = COLUMN_MAPPING[field_type]
-        # 2. Get Headers & Find Column Indices
-        headers = worksheet.row_values(1)
-        
+        # 2. Read just the Task_Name and target columns (one batch_get; also verifies their positions)
         try:
-            # Find the target column (e.g., 'status' or 'predecessor')
-            target_col_index = headers.index(target_header) + 1
-            
-            # Find the Task Name column (Your sheet uses 'Task_Name')
-            # We need this index to double-check, though mostly we use it for row lookup
-            task_name_header = "Task_Name" 
-            if task_name_header not in headers:
-                 return {"success": False, "message": f"❌ Sheet Error: Header 'Task_Name' not found. Found: {headers}"}
-            
-        except ValueError:
-            return {"success": False, "message": f"❌ Sheet Error: Column '{target_header}' not found in {headers}"}
+            columns = read_columns(worksheet, ["Task_Name", target_header])
+        except KeyError:
+            headers = get_sheet_headers(worksheet)
+            return {"success": False, "message": f"❌ Sheet Error: Column 'Task_Name' or '{target_header}' not found in {headers}"}
+        target_col_index = get_sheet_headers(worksheet).index(target_header) + 1
+
         # 3. Find the Row by matching Task_Name
-        all_records = worksheet.get_all_records()
-        clean_target_name = task_name.strip().lower()
-        
-        row_to_update = -1
-        for idx, record in enumerate(all_records):
-            # Access the record using the exact header "Task_Name"
-            current_task_name = str(record.get("Task_Name", "")).strip().lower()
-            
-            if current_task_name == clean_target_name:
-                row_to_update = idx + 2 # +2 because sheet is 1-indexed and has header row
-                break
+        row_to_update = find_row_by_name(columns["Task_Name"], task_name)
         
         if row_to_update == -1:
             return {"success": False, "message": f"❌ Task '{task_name}' not found."}
         # 4. Update the specific cell
         worksheet.update_cell(row_to_update, target_col_index, new_value)
+        invalidate_task_snapshot()
         return {
             "success": True, 
             "message": f"✅ Updated '{field_type}' to '{new_value}' for task '{task_name}'."
@@ -357,40 +404,42 @@ def update_task_field(task_name: str, field_type: str, new_value: str, request_a
 
 # Filter tasks by Date
 
-def filter_tasks_by_date(target_month: int = None, target_year: int = None, target_date: str = None) -> str:
+# Common date formats found in Google Sheets
+SHEET_DATE_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%b-%Y"]
+
+# Status values (lower-cased) that count as finished; every report uses these
+COMPLETED_STATUSES = {"done", "completed", "closed"}
+CLOSED_STATUSES = COMPLETED_STATUSES | {"cancelled", "canceled"}
+
+
+def parse_sheet_date(value) -> Optional[date]:
+    """Parses a date cell in any of SHEET_DATE_FORMATS; None if blank or unreadable"""
+    if not value or str(value).lower() == "none":
+        return None
+    value = str(value).strip().strip("'").strip('"')
+    for fmt in SHEET_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def select_tasks_by_date(tasks: List[Dict], target_month=None, target_year=None,
+                         target_date: str = None) -> List[Dict]:
     """
-    Filters tasks from Google Sheets based on date, month, or year.
-    Returns a formatted string containing task names, status, priority, and dependencies.
+    Returns the tasks whose end_date matches the given month / year / exact date (YYYY-MM-DD).
+    Blank filters (None or "") are ignored.
     """
-    tasks = fetch_all_tasks()
-    if not tasks:
-        return "No tasks found in the database."
-    
-    filtered_results = []
-    
-    # Common date formats found in Google Sheets
-    possible_formats = ["%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
-    
-    print(f"DEBUG: Filtering started. Target: M={target_month}, Y={target_year}, D={target_date}")
-    
+    if target_month is not None and not str(target_month).strip():
+        target_month = None
+    if target_year is not None and not str(target_year).strip():
+        target_year = None
+
+    matches = []
     for task in tasks:
-        # 1. Get the date string from 'end_date'
-        raw_val = task.get("end_date", "")
-        if not raw_val or str(raw_val).lower() == "none":
-            continue
-            
-        # Clean the string (remove single quotes if present)
-        raw_date_str = str(raw_val).strip().strip("'")
-        
-        parsed_date = None
-        # 2. Try to parse the date string into a Python datetime object
-        for fmt in possible_formats:
-            try:
-                parsed_date = datetime.datetime.strptime(raw_date_str, fmt)
-                break 
-            except (ValueError, TypeError):
-                continue 
-        
+        # 1. Parse 'end_date' (any of SHEET_DATE_FORMATS)
+        parsed_date = parse_sheet_date(task.get("end_date", ""))
         if not parsed_date:
             # Skip if date is unreadable
             continue
@@ -399,7 +448,7 @@ def filter_tasks_by_date(target_month: int = None, target_year: int = None, targ
         
         # Filter by specific date (YYYY-MM-DD)
         if target_date:
-            if parsed_date.strftime("%Y-%m-%d") != target_date.strip():
+            if parsed_date.isoformat() != target_date.strip():
                 match = False
         
         # Filter by Month
@@ -411,22 +460,40 @@ def filter_tasks_by_date(target_month: int = None, target_year: int = None, targ
         if target_year is not None:
             if parsed_date.year != int(target_year):
                 match = False
-                
-        # 4. If it matches, extract all relevant fields
+
         if match:
-            task_name = task.get("Task_Name", "Unknown Task")
-            status = task.get("status", "No Status")
-            priority = task.get("Priority", "No Priority")
-            # Added the Dependencies field here as you requested
-            predecessor = task.get("predecessor", "None") or "None"
-            
-            print(f"DEBUG: Match found! {task_name}")
-            
-            # Format as a clean string for the AI to process
-            filtered_results.append(
-                f"- Task: {task_name} | Due: {raw_date_str} | Status: {status} | Priority: {priority} | Dependencies: {predecessor}"
-            )
-    # 5. Return the final string
+            matches.append(task)
+    return matches
+
+
+def filter_tasks_by_date(target_month: int = None, target_year: int = None, target_date: str = None,
+                         tasks: Optional[List[Dict]] = None) -> str:
+    """
+    Filters tasks from Google Sheets based on date, month, or year.
+    Returns a formatted string containing task names, status, priority, and dependencies.
+    """
+    if tasks is None:
+        tasks = fetch_all_tasks()
+    if not tasks:
+        return "No tasks found in the database."
+    
+    print(f"DEBUG: Filtering started. Target: M={target_month}, Y={target_year}, D={target_date}")
+    
+    filtered_results = []
+    for task in select_tasks_by_date(tasks, target_month, target_year, target_date):
+        # Extract all relevant fields
+        task_name = task.get("Task_Name", "Unknown Task")
+        raw_date_str = str(task.get("end_date", "")).strip().strip("'")
+        status = task.get("status", "No Status")
+        priority = task.get("Priority", "No Priority")
+        # Added the Dependencies field here as you requested
+        predecessor = task.get("predecessor", "None") or "None"
+        
+        # Format as a clean string for the AI to process
+        filtered_results.append(
+            f"- Task: {task_name} | Due: {raw_date_str} | Status: {status} | Priority: {priority} | Dependencies: {predecessor}"
+        )
+    # Return the final string
     if not filtered_results:
         return "No tasks found matching that date criteria."
         
@@ -440,7 +507,8 @@ def get_task_statistics(
     request_analysis: str = None, # Make sure this is accepted
     group_by: str = "status", 
     target_month = None,  # Removed type hint to allow strings
-    target_year = None    # Removed type hint to allow strings
+    target_year = None,   # Removed type hint to allow strings
+    tasks: Optional[List[Dict]] = None
 ) -> str:
     """
     Calculates statistics.
@@ -463,33 +531,24 @@ def get_task_statistics(
     except ValueError:
         return json.dumps({"error": "Invalid Month or Year provided. Please use numbers."})
     # ----------------------------------------
-    tasks = fetch_all_tasks()
+    if tasks is None:
+        tasks = fetch_all_tasks()
     
     if not tasks:
         return json.dumps({}) 
-    possible_formats = ["%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
-    
-    def parse_date(date_str):
-        if not date_str: return None
-        date_str = str(date_str).strip().strip("'").strip('"') 
-        for fmt in possible_formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        return None
+    # (task, parsed end date) pairs - the shared snapshot dicts are never mutated
     filtered_tasks = []
     
     # --- FILTERING LOGIC ---
     for task in tasks:
         # If we are filtering by date, we need to check the date first
         is_date_match = True
+        dt_obj = None
         
         # Only parse the date if we actually need to filter by it
         if target_year or target_month or group_by == "month":
             raw_date = task.get("end_date", "") 
-            dt_obj = parse_date(raw_date)
-            task['_dt_obj'] = dt_obj # Store for later use
+            dt_obj = parse_sheet_date(raw_date)
             
             if target_year:
                 if not dt_obj or dt_obj.year != target_year:
@@ -498,18 +557,14 @@ def get_task_statistics(
             if target_month:
                 if not dt_obj or dt_obj.month != target_month:
                     is_date_match = False
-        else:
-            # If no date filtering is requested, we keep the task
-            task['_dt_obj'] = None
         
         if is_date_match:
-            filtered_tasks.append(task)
+            filtered_tasks.append((task, dt_obj))
     # --- COUNTING LOGIC ---
     values = []
     
     if group_by == "month":
-        for task in filtered_tasks:
-            dt = task.get('_dt_obj')
+        for task, dt in filtered_tasks:
             if dt:
                 values.append(dt.strftime("%b-%Y")) 
             else:
@@ -525,7 +580,11 @@ def get_task_statistics(
         
         # Use .get() with case-insensitive handling if needed, 
         # but here we assume your keys are consistent.
-        values = [str(task.get(target_key, "Unknown")) for task in filtered_tasks]
+        # The sheet header is 'Priority' (capitalised); accept either spelling
+        values = [
+            str(task.get(target_key, task.get(target_key.capitalize(), "Unknown")))
+            for task, _ in filtered_tasks
+        ]
         
     counts = Counter(values)
     
@@ -552,33 +611,18 @@ def get_tasks_due_soon(all_tasks, days=15):
     upcoming_tasks = []
 
     for task in all_tasks:
-        # Get the date string from the sheet (adjust key 'End_Date' to match your sheet header exactly)
-        date_str = str(task.get("End_Date", "")).strip() 
-        task_name = task.get("Task", "Unknown Task") # Adjust key 'Task' to match your sheet
-        status = task.get("Status", "Pending")
+        # Keys match the real sheet headers (end_date / Task_Name / status)
+        date_str = str(task.get("end_date", "")).strip()
+        task_name = task.get("Task_Name", "Unknown Task")
+        status = str(task.get("status", "") or "Pending")
 
-        # Skip if empty or already done
-        if not date_str or status.lower() == "completed":
+        # Skip if empty or already closed
+        if not date_str or status.strip().lower() in CLOSED_STATUSES:
             continue
 
-        # 2. Robust Date Parsing
-        # Google Sheets can send dates in many formats. We try the most common ones.
-        task_date = None
-        date_formats = [
-            "%Y-%m-%d",  # 2024-02-25
-            "%d-%m-%Y",  # 25-02-2024
-            "%d/%m/%Y",  # 25/02/2024
-            "%m/%d/%Y",  # 02/25/2024
-            "%d-%b-%Y"   # 25-Feb-2024
-        ]
+        # 2. Robust Date Parsing (Google Sheets can send dates in many formats)
+        task_date = parse_sheet_date(date_str)
 
-        for fmt in date_formats:
-            try:
-                task_date = datetime.strptime(date_str, fmt).date()
-                break # Found a match!
-            except ValueError:
-                continue # Try the next format
-        
         # If we couldn't parse the date, skip this row (or log an error)
         if task_date is None:
             continue 
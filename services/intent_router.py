@@ -0,0 +1,263 @@
+import re
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from config import FAST_PATH_ENABLED, FAST_PATH_MIN_CONFIDENCE
+from services.google_sheets_service import (
+    select_tasks_by_date,
+    get_task_statistics,
+    check_schedule_conflicts,
+    update_task_field
+)
+from services.response_templates import (
+    render_task_table, render_chart, render_confirmation, STATISTICS_CHART_TITLES
+)
+
+# --- DETERMINISTIC FAST PATH ---
+# Plain lookups ("tasks due in March", "status breakdown", "any conflicts?",
+# "set X to Done") are answered locally from the task snapshot. Rules must match
+# the whole message (bar a polite prefix / suffix), and any client, assignee,
+# status, month or year the intent would ignore sends the message to the LLM:
+# a filtered question answered from unfiltered data is worse than a slow answer.
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10,
+    "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+STATUS_WORDS = ["done", "completed", "pending", "in progress", "on hold", "cancelled", "not started"]
+GROUP_BY_WORDS = {
+    "status": "status", "priority": "priority", "priorities": "priority",
+    "assignee": "assigned_to", "owner": "assigned_to", "person": "assigned_to", "people": "assigned_to",
+    "month": "month", "monthly": "month",
+}
+
+# Words that signal the user wants reasoning, prose or a side effect we don't template
+LLM_ONLY_WORDS = {"why", "explain", "email", "send", "add", "create", "new", "flowchart", "gantt",
+                  "diagram", "summary", "summarize", "recommend", "should", "plan", "risk", "risks"}
+# Negations turn a lookup into a different question ("tasks not in the breakdown")
+NEGATION_WORDS = {"not", "no", "without", "except", "excluding", "other", "besides"}
+# Words that carry no filter; anything else left over lowers classifier confidence
+FILLER_WORDS = {"the", "a", "an", "of", "all", "me", "show", "give", "get", "list", "please", "pls",
+                "can", "could", "you", "what", "whats", "is", "are", "there", "our", "current", "s"}
+
+_MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+_STATUS_PATTERN = "|".join(STATUS_WORDS)
+_GROUP_PATTERN = "|".join(GROUP_BY_WORDS)
+_PREFIX = r"(?:(?:please|pls|can you|could you|show(?: me)?|give me|list|get|what(?:'s| is| are)|which are)\s+)*(?:the\s+|all\s+)?"
+_SUFFIX = r"(?:\s+(?:please|pls|thanks|thank you))?"
+
+
+def _rule(body: str) -> re.Pattern:
+    """A rule matches the whole normalized message, optionally wrapped in polite words"""
+    return re.compile(_PREFIX + body + _SUFFIX)
+
+
+RULES = [
+    # "tasks due in March", "which tasks are due in mar 2026", "deadlines for March"
+    ("due_in_month", _rule(
+        rf"(?:(?:which|what)\s+)?(?:tasks?\s+)?(?:are\s+|is\s+)?(?:due|ending|finishing|deadlines?)\s+"
+        rf"(?:in|for|during)\s+(?P<month>{_MONTH_PATTERN})(?:\s+(?P<year>\d{{4}}))?")),
+    # "status breakdown", "priority distribution of tasks", "tasks by assignee"
+    ("statistics", _rule(
+        rf"(?:task\s+)?(?P<group>{_GROUP_PATTERN})\s+(?:breakdown|distribution|split|stats|statistics|chart|counts?)"
+        rf"(?:\s+(?:of|for)\s+(?:all\s+)?(?:the\s+)?tasks)?")),
+    ("statistics", _rule(
+        rf"(?:tasks?|count|counts|breakdown|chart)(?:\s+of\s+tasks)?\s+(?:by|per)\s+(?P<group>{_GROUP_PATTERN})")),
+    # "any schedule conflicts", "check dependency conflicts", "are there any conflicts"
+    ("conflicts", _rule(
+        r"(?:(?:are there|check(?: for)?|any)\s+)?(?:any\s+)?"
+        r"(?:(?:schedule|dependency|dependencies)\s+)?(?:conflicts?|clash(?:es)?)")),
+    ("conflicts", _rule(r"(?:(?:are there|check(?: for)?|any)\s+)?(?:any\s+)?(?:schedule|dependency|dependencies)\s+issues")),
+    # "set Site survey to Done", "mark 'UAT' as completed"
+    ("update_status", re.compile(
+        rf"(?:set|mark|change|update|move)\s+(?:the\s+)?(?:status\s+of\s+)?['\"]?(?P<task>.+?)['\"]?\s+"
+        rf"(?:to|as)\s+(?P<status>{_STATUS_PATTERN})")),
+]
+
+# Lightweight keyword classifier for phrasings the rules miss.
+# Anchors identify the intent; support words raise confidence, unknown words lower it.
+CLASSIFIER = {
+    "statistics": {
+        "anchors": {"breakdown", "distribution", "statistics", "stats", "chart", "graph", "split"},
+        "support": {"status", "priority", "tasks", "by", "per", "show", "count", "counts", "how", "many"},
+    },
+    "conflicts": {
+        "anchors": {"conflict", "conflicts", "clash", "clashes", "overlap", "overlaps"},
+        "support": {"schedule", "any", "dependency", "dependencies", "check", "predecessor", "predecessors"},
+    },
+}
+_QUALIFIED_CONFIDENCE = 0.3  # Below any sensible FAST_PATH_MIN_CONFIDENCE
+
+
+class Intent(NamedTuple):
+    name: str
+    args: Dict
+    confidence: float
+    source: str  # "rule" or "classifier"
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"\s+", " ", message.lower().strip().rstrip("?!.")).strip()
+
+
+def _match_rules(text: str) -> Optional[tuple]:
+    """(intent, text left after removing the spans the intent uses) for the first rule matching the message"""
+    for name, pattern in RULES:
+        match = pattern.fullmatch(text)
+        if not match:
+            continue
+        groups = match.groupdict()
+        if name == "due_in_month":
+            args = {"target_month": MONTHS[groups["month"]], "target_year": groups.get("year")}
+            used = ("month", "year")
+        elif name == "statistics":
+            args = {"group_by": GROUP_BY_WORDS[groups["group"]]}
+            used = ("group",)
+        elif name == "update_status":
+            args = {"task_name": groups["task"].strip(), "new_value": groups["status"]}
+            used = ("task", "status")
+        else:
+            args, used = {}, ()
+        leftover = text
+        for group in used:
+            if match.group(group):
+                start, end = match.span(group)
+                leftover = leftover[:start] + " " * (end - start) + leftover[end:]
+        return Intent(name, args, 1.0, "rule"), leftover
+    return None
+
+
+def _classify(words: set) -> Optional[Intent]:
+    best = None
+    for name, vocab in CLASSIFIER.items():
+        if not words & vocab["anchors"]:
+            continue
+        unknown = words - vocab["anchors"] - vocab["support"] - FILLER_WORDS - set(GROUP_BY_WORDS)
+        confidence = min(0.5 + 0.15 * len(words & vocab["support"]) - 0.15 * len(unknown), 0.95)
+        if best is None or confidence > best.confidence:
+            args = {}
+            if name == "statistics":
+                group = next((GROUP_BY_WORDS[w] for w in words if w in GROUP_BY_WORDS), "status")
+                args = {"group_by": group}
+            best = Intent(name, args, confidence, "classifier")
+    return best
+
+
+def _qualifier_phrases(tasks: List[Dict]) -> set:
+    """Lower-cased clients, assignees and statuses in the sheet, plus their distinctive words"""
+    phrases = set(STATUS_WORDS)
+    for task in tasks:
+        for key in ("Client", "assigned_to", "status"):
+            value = str(task.get(key) or "").strip().lower()
+            if value:
+                phrases.add(value)
+                phrases.update(w for w in re.findall(r"[a-z]+", value) if len(w) >= 3)
+    # Router vocabulary is never a filter on its own ("status", "tasks", "schedule" ...)
+    vocabulary = set(GROUP_BY_WORDS) | FILLER_WORDS | {"tasks", "task"}
+    for vocab in CLASSIFIER.values():
+        vocabulary |= vocab["anchors"] | vocab["support"]
+    return phrases - vocabulary
+
+
+def _names_qualifier(text: str, tasks: List[Dict]) -> bool:
+    """True when text mentions a month, year, status, client or assignee"""
+    words = set(re.findall(r"[a-z]+", text))
+    if words & set(MONTHS) or re.search(r"\b(?:19|20)\d{2}\b", text):
+        return True
+    return any(re.search(rf"\b{re.escape(phrase)}\b", text) for phrase in _qualifier_phrases(tasks))
+
+
+def route_intent(message: str, tasks: Optional[List[Dict]] = None) -> Optional[Intent]:
+    """
+    Rules first, then the keyword classifier. Returns None when the LLM should handle it.
+    tasks (the snapshot) supply the client / assignee / status names that count as filters.
+    """
+    text = _normalize(message)
+    words = set(re.findall(r"[a-z]+", text))
+    if not text or words & (LLM_ONLY_WORDS | NEGATION_WORDS):
+        return None
+
+    matched = _match_rules(text)
+    if matched:
+        intent, leftover = matched
+    else:
+        intent = _classify(words)
+        leftover = text
+        if intent and intent.name == "statistics":
+            leftover = re.sub(rf"\b(?:{_GROUP_PATTERN})\b", " ", text)
+    if intent and _names_qualifier(leftover, tasks or []):
+        # A filter the intent can't apply: answering would ignore it
+        intent = intent._replace(confidence=min(intent.confidence, _QUALIFIED_CONFIDENCE))
+
+    if intent and intent.confidence >= FAST_PATH_MIN_CONFIDENCE:
+        return intent
+    return None
+
+
+def _find_task(tasks: List[Dict], name: str) -> Optional[Dict]:
+    target = name.strip().lower()
+    return next((t for t in tasks if str(t.get("Task_Name", "")).strip().lower() == target), None)
+
+
+def _canonical_status(tasks: List[Dict], status: str) -> str:
+    """Reuse the sheet's own spelling of a status when it already exists ('In Progress' vs 'in progress')"""
+    for task in tasks:
+        existing = str(task.get("status", "")).strip()
+        if existing.lower() == status.lower():
+            return existing
+    return status.title()
+
+
+def answer_fast_path(message: str, tasks: List[Dict]) -> Optional[str]:
+    """
+    Answers a structured query from the task snapshot without the LLM.
+    Returns the rendered answer, or None to fall back to the LLM.
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+
+    intent = route_intent(message, tasks)
+    if not intent:
+        return None
+
+    started = time.perf_counter()
+    answer = None
+
+    if intent.name == "due_in_month":
+        year = intent.args["target_year"]
+        matches = select_tasks_by_date(tasks, intent.args["target_month"], year)
+        month_name = datetime(2000, intent.args["target_month"], 1).strftime("%B")
+        period = f"{month_name} {year}" if year else month_name
+        answer = render_task_table(matches, title=f"Tasks due in {period}",
+                                   empty_message=f"No tasks found due in {period}.")
+
+    elif intent.name == "statistics":
+        group_by = intent.args["group_by"]
+        counts = json.loads(get_task_statistics(group_by=group_by, tasks=tasks))
+        if "error" in counts:
+            return None
+        answer = render_chart(counts, STATISTICS_CHART_TITLES[group_by])
+
+    elif intent.name == "conflicts":
+        answer = check_schedule_conflicts(tasks=tasks)
+
+    elif intent.name == "update_status":
+        # Only act when the name is an exact match; fuzzy names go to the LLM
+        task = _find_task(tasks, intent.args["task_name"])
+        if not task:
+            return None
+        result = update_task_field(
+            task_name=str(task.get("Task_Name")),
+            field_type="status",
+            new_value=_canonical_status(tasks, intent.args["new_value"]),
+            request_analysis=f"Fast path: {message}"
+        )
+        answer = render_confirmation(result["message"])
+
+    if answer is not None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"⚡ Fast path '{intent.name}' ({intent.source}, {intent.confidence:.2f}) answered in {elapsed_ms:.1f} ms", flush=True)
+    return answer
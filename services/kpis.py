@@ -0,0 +1,135 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import KPI_DUE_SOON_DAYS
+from services.google_sheets_service import CLOSED_STATUSES, COMPLETED_STATUSES, parse_sheet_date
+from services.task_store import TaskSnapshot, add_snapshot_listener
+
+# --- SERVER-SIDE KPIs ---
+# Dashboard metrics served from running aggregates instead of in the browser
+# from the full task dump. When the snapshot changes, only the tasks that
+# changed are subtracted / added; date-dependent numbers (overdue, due soon,
+# slippage) are derived from a count of open tasks per end date, so a new day
+# needs no pass over the tasks either. The ETag changes exactly when the
+# numbers can (content hash + day).
+
+
+def _label(task: Dict, key: str, fallback: str) -> str:
+    return str(task.get(key) or fallback).strip() or fallback
+
+
+class KpiAggregate:
+    """Running KPI counts for a task list; add(task, -1) removes a task's contribution"""
+
+    def __init__(self, tasks: List[Dict] = ()):
+        self.total = 0
+        self.completed = 0
+        self.open_end_dates = Counter()  # { end date: open tasks ending that day }
+        self.by = {"status": Counter(), "Priority": Counter(), "assigned_to": Counter(), "Client": Counter()}
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task: Dict, sign: int = 1) -> None:
+        self.total += sign
+        for key, fallback in (("status", "Unknown"), ("Priority", "N/A"), ("assigned_to", "Unassigned"), ("Client", "General")):
+            self.by[key][_label(task, key, fallback)] += sign
+        status = str(task.get("status", "")).strip().lower()
+        if status in COMPLETED_STATUSES:
+            self.completed += sign
+        if status not in CLOSED_STATUSES:
+            end = parse_sheet_date(task.get("end_date"))
+            if end is not None:
+                self.open_end_dates[end] += sign
+
+    def render(self, today: Optional[date] = None, due_soon_days: int = KPI_DUE_SOON_DAYS) -> Dict:
+        today = today or date.today()
+        due_soon_cutoff = today + timedelta(days=due_soon_days)
+        overdue = due_soon = total_days = max_days = 0
+        for end, count in self.open_end_dates.items():
+            if count <= 0:
+                continue
+            if end < today:
+                overdue += count
+                total_days += (today - end).days * count
+                max_days = max(max_days, (today - end).days)
+            elif end <= due_soon_cutoff:
+                due_soon += count
+
+        counts = {key: {label: n for label, n in counter.items() if n > 0} for key, counter in self.by.items()}
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "completion_rate": round(self.completed / self.total, 3) if self.total else 0.0,
+            "overdue": overdue,
+            "due_soon": due_soon,
+            "due_soon_days": due_soon_days,
+            # Open tasks past their end date, measured in days
+            "slippage": {
+                "late_tasks": overdue,
+                "total_days": total_days,
+                "avg_days": round(total_days / overdue, 1) if overdue else 0.0,
+                "max_days": max_days,
+            },
+            "by_status": counts["status"],
+            "by_priority": counts["Priority"],
+            "by_assignee": counts["assigned_to"],
+            "by_client": counts["Client"],
+            "as_of": today.isoformat(),
+        }
+
+
+def compute_kpis(tasks: List[Dict], today: Optional[date] = None, due_soon_days: int = KPI_DUE_SOON_DAYS) -> Dict:
+    """Counts, completion rate and schedule slippage for a task list"""
+    return KpiAggregate(tasks).render(today, due_soon_days)
+
+
+_lock = threading.Lock()
+_aggregate = {"content_hash": None, "kpis": KpiAggregate()}
+_rendered: Dict = {"key": None, "kpis": None}
+
+
+def _keyed(tasks: List[Dict]) -> Dict[str, Dict]:
+    """{task_id#n: task}; the occurrence number keeps duplicate ids apart"""
+    seen = Counter()
+    keyed = {}
+    for task in tasks:
+        task_id = str(task.get("task_id") or task.get("Task_Name") or "")
+        seen[task_id] += 1
+        keyed[f"{task_id}#{seen[task_id]}"] = task
+    return keyed
+
+
+def apply_snapshot_change(old, new) -> None:
+    """Snapshot listener: move the aggregate from old to new by the changed tasks only"""
+    with _lock:
+        if _aggregate["content_hash"] != old.content_hash:
+            return  # Not built yet (or out of step): get_kpis rebuilds it on demand
+        aggregate = _aggregate["kpis"]
+        previous = _keyed(old.tasks)
+        for key, task in _keyed(new.tasks).items():
+            before = previous.pop(key, None)
+            if before == task:
+                continue
+            if before is not None:
+                aggregate.add(before, -1)
+            aggregate.add(task)
+        for task in previous.values():
+            aggregate.add(task, -1)
+        _aggregate["content_hash"] = new.content_hash
+
+
+def get_kpis(snapshot: TaskSnapshot) -> Tuple[Dict, str]:
+    """(kpis, etag) for a snapshot; rendered again only when the content or the day changes"""
+    today = date.today()
+    key = (snapshot.content_hash, today.isoformat())
+    with _lock:
+        if _aggregate["content_hash"] != snapshot.content_hash:
+            _aggregate.update(content_hash=snapshot.content_hash, kpis=KpiAggregate(snapshot.tasks))
+        if _rendered["key"] != key:
+            _rendered.update(key=key, kpis=_aggregate["kpis"].render(today))
+        kpis = _rendered["kpis"]
+    return kpis, f'"kpis-{snapshot.content_hash[:16]}-{today.isoformat()}"'
+
+
+add_snapshot_listener(apply_snapshot_change)
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from config import LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_SAVE_DELAY_SECONDS
+
+# --- LLM RESPONSE CACHE ---
+# LRU + TTL cache of LLM answers keyed by (model, prompt, task snapshot version, date).
+# Optionally persisted to a JSON file (LLM_CACHE_PATH) so restarts keep warm entries.
+# Saves are debounced: a background timer writes the file at most once per
+# LLM_CACHE_SAVE_DELAY_SECONDS, so answering a request never waits on disk I/O.
+
+_cache = OrderedDict()  # { key: {"value": str, "stored_at": float} }
+_loaded = False
+_stats = {"hits": 0, "misses": 0}
+_save_lock = threading.Lock()
+_save_timer: Optional[threading.Timer] = None
+
+
+def make_cache_key(model: str, prompt, snapshot_version: int, day: Optional[str] = None) -> str:
+    """Hash of everything that can change the answer"""
+    day = day or time.strftime("%Y-%m-%d")
+    raw = json.dumps([model, prompt, snapshot_version, day], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _load_from_disk() -> None:
+    global _loaded
+    _loaded = True
+    if not LLM_CACHE_PATH or not os.path.exists(LLM_CACHE_PATH):
+        return
+    try:
+        with open(LLM_CACHE_PATH, "r", encoding="utf-8") as f:
+            for key, entry in json.load(f).items():
+                _cache[key] = entry
+        print(f"💾 Loaded {len(_cache)} cached LLM responses", flush=True)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load LLM cache: {e}")
+
+
+def _save_to_disk() -> None:
+    global _save_timer
+    with _save_lock:
+        _save_timer = None
+        entries = dict(_cache)
+    try:
+        tmp_path = f"{LLM_CACHE_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, LLM_CACHE_PATH)
+    except OSError as e:
+        print(f"❌ Could not persist LLM cache: {e}")
+
+
+def _schedule_save() -> None:
+    """Write the file once after a burst of changes, off the request path"""
+    global _save_timer
+    if not LLM_CACHE_PATH:
+        return
+    with _save_lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(LLM_CACHE_SAVE_DELAY_SECONDS, _save_to_disk)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+def flush_llm_cache() -> None:
+    """Shutdown hook: write a pending save now"""
+    with _save_lock:
+        timer = _save_timer
+    if timer is not None:
+        timer.cancel()
+        _save_to_disk()
+
+
+def cache_get(key: str) -> Optional[str]:
+    if not _loaded:
+        _load_from_disk()
+    with _save_lock:  # The save timer copies _cache from its own thread
+        entry = _cache.get(key)
+        if entry is None or time.time() - entry["stored_at"] > LLM_CACHE_TTL_SECONDS:
+            if entry is not None:
+                del _cache[key]
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry["value"]
+
+
+def cache_set(key: str, value: str) -> None:
+    if not _loaded:
+        _load_from_disk()
+    with _save_lock:
+        _cache[key] = {"value": value, "stored_at": time.time()}
+        _cache.move_to_end(key)
+        while len(_cache) > LLM_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    _schedule_save()
+
+
+def get_cache_stats() -> dict:
+    return {"entries": len(_cache), **_stats}
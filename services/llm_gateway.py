@@ -0,0 +1,135 @@
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+from typing import AsyncIterator, Optional
+from config import (
+    GROQ_API_KEY, LLM_BASE_URL, LLM_TIMEOUT_SECONDS,
+    LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS
+)
+
+# --- ASYNC LLM GATEWAY ---
+# One pooled AsyncOpenAI client (HTTP keep-alive) shared by every endpoint,
+# a semaphore bounding concurrent LLM calls, and a deadline on each call.
+# The deadline covers the wait for a concurrency slot too, so a queued request
+# fails over (model router) instead of waiting out the budget in line.
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """Lazily build the shared client so it binds to the running event loop"""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                keepalive_expiry=30
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0)
+        )
+        _client = AsyncOpenAI(
+            base_url=LLM_BASE_URL,
+            api_key=GROQ_API_KEY,
+            http_client=http_client,
+            max_retries=1
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def close_llm_client() -> None:
+    """Release pooled connections (called from the shutdown event)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+async def _acquire_slot(deadline: float, model) -> float:
+    """Waits for a concurrency slot within the deadline; returns the seconds left for the call"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        await asyncio.wait_for(_get_semaphore().acquire(), timeout=deadline)
+    except asyncio.TimeoutError:
+        print(f"⏱️ No LLM slot free within {deadline}s deadline (model={model})", flush=True)
+        raise
+    remaining = deadline - (loop.time() - started)
+    if remaining <= 0:
+        _get_semaphore().release()
+        raise asyncio.TimeoutError()
+    return remaining
+
+
+async def chat_completion(deadline: Optional[float] = None, **kwargs):
+    """
+    Awaitable chat.completions.create with a concurrency slot and a deadline (seconds).
+    Raises asyncio.TimeoutError when the deadline passes (waiting for the slot included).
+    """
+    deadline = deadline or LLM_TIMEOUT_SECONDS
+    remaining = await _acquire_slot(deadline, kwargs.get("model"))
+    try:
+        return await asyncio.wait_for(
+            get_llm_client().chat.completions.create(**kwargs),
+            timeout=remaining
+        )
+    except asyncio.TimeoutError:
+        print(f"⏱️ LLM call exceeded {deadline}s deadline (model={kwargs.get('model')})", flush=True)
+        raise
+    finally:
+        _get_semaphore().release()
+
+
+async def stream_chat_completion(deadline: Optional[float] = None, **kwargs) -> AsyncIterator:
+    """
+    Streaming chat completion. The concurrency slot is held until the stream is consumed.
+    The deadline bounds slot wait + opening the stream, and the gap between chunks.
+    """
+    deadline = deadline or LLM_TIMEOUT_SECONDS
+    remaining = await _acquire_slot(deadline, kwargs.get("model"))
+    try:
+        stream = await asyncio.wait_for(
+            get_llm_client().chat.completions.create(stream=True, **kwargs),
+            timeout=remaining
+        )
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=deadline)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        finally:
+            await stream.close()
+    finally:
+        _get_semaphore().release()
+
+
+async def cancel_on_disconnect(request, coro, poll_interval: float = 0.5):
+    """
+    Runs coro, cancelling it if the HTTP client disconnects first.
+    Returns the coroutine result, or None when the client went away.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while not task.done():
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                break
+            if await request.is_disconnected():
+                print("🔌 Client disconnected, cancelling LLM work", flush=True)
+                task.cancel()
+                return None
+        return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,126 @@
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List
+from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from config import MODEL_ROUTE_OVERRIDES
+from services.llm_gateway import chat_completion, stream_chat_completion
+
+# --- MODEL TIERING ROUTER ---
+# Each call site names a task type; the route lists models in preference order
+# and a latency budget. On timeout / rate limit / provider error the next
+# (faster) model is tried. Override routes with the MODEL_ROUTES env var (JSON).
+
+DEFAULT_MODEL_ROUTES = {
+    # Picking a tool needs reliable function calling more than eloquence
+    "tool_selection": {"models": ["llama-3.1-8b-instant"], "latency_budget": 15},
+    # Phrasing a tool result for the user
+    "tool_answer": {"models": ["llama-3.1-8b-instant"], "latency_budget": 15},
+    # Executive summary: the 70b model is much better at the date logic, 8b is the fallback
+    "summarization": {"models": ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"], "latency_budget": 12},
+    # Free-form analysis of stats sent by the dashboard (/api/ask)
+    "chat": {"models": ["llama-3.1-8b-instant"], "latency_budget": 15},
+    # Rolling conversation summaries (background, cheap)
+    "session_summary": {"models": ["llama-3.1-8b-instant"], "latency_budget": 10},
+}
+
+
+def _route_error(override) -> str:
+    """Why an override can't be used ('' when it's valid); a bad route would fail every call"""
+    if not isinstance(override, dict):
+        return "expected an object"
+    models = override.get("models", ["default"])
+    if not isinstance(models, list) or not models or not all(isinstance(m, str) and m.strip() for m in models):
+        return "models must be a non-empty list of model names"
+    budget = override.get("latency_budget", 1)
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget <= 0:
+        return "latency_budget must be a positive number of seconds"
+    return ""
+
+
+MODEL_ROUTES = {name: dict(route) for name, route in DEFAULT_MODEL_ROUTES.items()}
+for _task_type, _override in MODEL_ROUTE_OVERRIDES.items():
+    _error = _route_error(_override)
+    if _error:
+        print(f"❌ Ignoring MODEL_ROUTES entry '{_task_type}': {_error}")
+        continue
+    MODEL_ROUTES.setdefault(_task_type, dict(DEFAULT_MODEL_ROUTES["chat"])).update(_override)
+
+# Errors worth retrying on the next model in the route
+FALLBACK_ERRORS = (asyncio.TimeoutError, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# { task_type: { model: {"served": n, "failed": n, "total_ms": x} } }
+MODEL_USAGE: Dict[str, Dict[str, Dict]] = {}
+
+
+def get_route(task_type: str) -> Dict:
+    return MODEL_ROUTES.get(task_type, MODEL_ROUTES["chat"])
+
+
+def route_models(task_type: str) -> List[str]:
+    return list(get_route(task_type)["models"])
+
+
+def _record(task_type: str, model: str, outcome: str, elapsed_ms: float) -> None:
+    stats = MODEL_USAGE.setdefault(task_type, {}).setdefault(model, {"served": 0, "failed": 0, "total_ms": 0.0})
+    stats[outcome] += 1
+    stats["total_ms"] += elapsed_ms
+
+
+def get_model_stats() -> Dict:
+    return {"routes": MODEL_ROUTES, "usage": MODEL_USAGE}
+
+
+async def routed_completion(task_type: str, **kwargs):
+    """chat_completion on the first model of the route that answers within the latency budget"""
+    route = get_route(task_type)
+    models = route["models"]
+    last_error = None
+
+    for model in models:
+        started = time.perf_counter()
+        try:
+            response = await chat_completion(model=model, deadline=route["latency_budget"], **kwargs)
+        except FALLBACK_ERRORS as e:
+            _record(task_type, model, "failed", (time.perf_counter() - started) * 1000)
+            print(f"⚠️ {task_type}: {model} failed ({type(e).__name__}), trying next model", flush=True)
+            last_error = e
+            continue
+        _record(task_type, model, "served", (time.perf_counter() - started) * 1000)
+        print(f"🧭 {task_type} served by {model}", flush=True)
+        return response
+
+    raise last_error
+
+
+async def routed_stream(task_type: str, **kwargs) -> AsyncIterator:
+    """
+    Streaming counterpart of routed_completion.
+    Falling back is only possible until the first chunk has been delivered.
+    """
+    route = get_route(task_type)
+    models = route["models"]
+    last_error = None
+
+    for model in models:
+        started = time.perf_counter()
+        stream = stream_chat_completion(model=model, deadline=route["latency_budget"], **kwargs)
+        try:
+            first_chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            _record(task_type, model, "served", (time.perf_counter() - started) * 1000)
+            return
+        except FALLBACK_ERRORS as e:
+            _record(task_type, model, "failed", (time.perf_counter() - started) * 1000)
+            print(f"⚠️ {task_type}: {model} failed ({type(e).__name__}), trying next model", flush=True)
+            last_error = e
+            await stream.aclose()
+            continue
+
+        print(f"🧭 {task_type} streamed by {model}", flush=True)
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+        _record(task_type, model, "served", (time.perf_counter() - started) * 1000)
+        return
+
+    raise last_error
@@ -1,26 +1,39 @@
 import os
 import json
+from collections import OrderedDict
 from datetime import datetime
-from openai import OpenAI
-from config import OPENAI_API_KEY, GROQ_API_KEY
+import asyncio
+import time
+from config import (
+    OPENAI_API_KEY, GROQ_API_KEY, CONTEXT_ENCODING,
+    TOOL_RESPONSE_POLICY_OVERRIDES
+)
 from services.google_sheets_service import (
-    fetch_all_tasks, 
     update_task_field, 
     add_task_from_ai,
     filter_tasks_by_date,
     get_task_statistics,
     check_schedule_conflicts,
-    get_tasks_due_soon
+    get_tasks_due_soon,
+    select_tasks_by_date
+)
+from types import SimpleNamespace
+from typing import AsyncIterator, List, Optional, Tuple
+from services.email_outbox import queue_project_email
+from services.model_router import routed_completion, routed_stream, route_models
+from services.intent_router import answer_fast_path
+from services.llm_cache import make_cache_key, cache_get, cache_set
+from services.task_store import TaskSnapshot, get_task_snapshot, peek_snapshot_version
+from services.tool_cache import MEMOIZED_TOOLS, memo_get, memo_set
+from services.task_index import find_tasks_in_timeframe
+from services.workload import check_workload
+from services.task_history import get_trend_stats
+from services.response_templates import (
+    render_task_table, render_chart, render_confirmation, STATISTICS_CHART_TITLES
 )
-from typing import List, Optional
-from services.email_service import send_email_via_brevo
 import sys
 
-#client = OpenAI(api_key=OPENAI_API_KEY)
-client = OpenAI(
-    base_url="https://api.groq.com/openai/v1",
-    api_key=os.environ.get("GROQ_API_KEY") 
-)
+# LLM calls go through services/llm_gateway (pooled async client, deadlines, concurrency limit)
 
 def format_tasks_for_context(tasks: List) -> str:
     """Format tasks into a readable context string with complete information"""
@@ -52,6 +65,108 @@ def format_tasks_for_context(tasks: List) -> str:
     return f"Current Tasks in System:\n" + "\n".join(formatted_tasks)
 
 
+# --- COMPACT CONTEXT ENCODING ---
+# Same information as format_tasks_for_context, but the column labels are stated
+# once in a header and repeated values (client, status, ...) are interned into short codes.
+
+COMPACT_COLUMNS = ["id", "task", "assignee", "status", "start", "end", "client", "priority", "pred"]
+_COMPACT_CACHE = OrderedDict()  # { (snapshot content_hash, year): encoded_text }
+_COMPACT_CACHE_SIZE = 8
+_CONTEXT_DATE_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
+
+
+def _short_date(value, year: int) -> str:
+    """'2026-03-17' -> '03-17' when in the reference year, 'YYYY-MM-DD' otherwise"""
+    raw = str(value or "").strip().strip("'")
+    if not raw or raw.lower() == "none":
+        return ""
+    for fmt in _CONTEXT_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(raw, fmt)
+            return parsed.strftime("%m-%d") if parsed.year == year else parsed.strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return raw  # Unparseable dates are passed through untouched
+
+
+def _compact_cell(value) -> str:
+    """Keep the row delimiter out of free-text cells"""
+    return str(value if value is not None else "").replace("|", "/").replace("\n", " ").strip()
+
+
+def format_tasks_compact(tasks: List, reference_year: Optional[int] = None, content_hash: Optional[str] = None) -> str:
+    """
+    Compact tabular encoding of the task list for LLM prompts.
+    Header once, one '|' delimited row per task, short dates and interned status/client/priority codes.
+    Results are cached per task snapshot when its content_hash is given.
+    """
+    if not tasks:
+        return "No tasks found in the system."
+
+    year = reference_year or datetime.now().year
+    cache_key = (content_hash, year)
+    if content_hash and cache_key in _COMPACT_CACHE:
+        _COMPACT_CACHE.move_to_end(cache_key)
+        return _COMPACT_CACHE[cache_key]
+
+    # 1. Intern repeated values -> short codes (S1, C1, P1 ...)
+    interned = {"status": ("S", {}), "client": ("C", {}), "priority": ("P", {})}
+
+    def intern(kind: str, value) -> str:
+        value = _compact_cell(value)
+        if not value:
+            return ""
+        prefix, table = interned[kind]
+        if value not in table:
+            table[value] = f"{prefix}{len(table) + 1}"
+        return table[value]
+
+    # 2. Build rows
+    rows = []
+    for task in tasks:
+        pred_val = _compact_cell(task.get('predecessor', task.get('successor', '')))
+        if pred_val.lower() == 'none':
+            pred_val = ""
+        rows.append("|".join([
+            _compact_cell(task.get('task_id', '')),
+            _compact_cell(task.get('Task_Name', '')),
+            _compact_cell(task.get('assigned_to', '')),
+            intern("status", task.get('status', '')),
+            _short_date(task.get('start_date', ''), year),
+            _short_date(task.get('end_date', ''), year),
+            intern("client", task.get('Client', '')),
+            intern("priority", task.get('Priority', '')),
+            pred_val,
+        ]))
+
+    # 3. Legend + header + rows
+    legend = []
+    for kind, (_, table) in interned.items():
+        if table:
+            legend.append(f"{kind}: " + ", ".join(f"{code}={value}" for value, code in table.items()))
+
+    encoded = (
+        f"Current Tasks in System ({len(rows)} rows, '|' delimited, empty = N/A, "
+        f"MM-DD dates are in {year}, pred = predecessor task id):\n"
+        + "\n".join(legend) + "\n"
+        + "|".join(COMPACT_COLUMNS) + "\n"
+        + "\n".join(rows)
+    )
+
+    if content_hash:
+        _COMPACT_CACHE[cache_key] = encoded
+        if len(_COMPACT_CACHE) > _COMPACT_CACHE_SIZE:
+            _COMPACT_CACHE.popitem(last=False)
+    return encoded
+
+
+def build_tasks_context(tasks: List, content_hash: Optional[str] = None) -> str:
+    """Encode tasks for a prompt using the configured CONTEXT_ENCODING ('compact' or 'verbose')"""
+    if CONTEXT_ENCODING == "verbose":
+        return format_tasks_for_context(tasks)
+    return format_tasks_compact(tasks, content_hash=content_hash)
+
+
 def filter_tasks_by_assignee(tasks: List, assignee_name: str) -> List:
     """Filter tasks for a specific assignee (case-insensitive)"""
     filtered_tasks = []
@@ -65,19 +180,8 @@ def filter_tasks_by_assignee(tasks: List, assignee_name: str) -> List:
     
     return filtered_tasks
 
-def generate_ai_response(
-    user_message: str, 
-    conversation_history: Optional[List[str]] = None
-) -> str:
-    """Generate AI response using OpenAI API with DEBUGGING enabled"""
-    try:
-        # Fetch current tasks for context
-        tasks = fetch_all_tasks()
-        tasks_context = format_tasks_for_context(tasks)
-        today_date = datetime.now().strftime("%Y-%m-%d")
-
-        # --- TOOL DEFINITIONS ---
-        tools = [
+# --- TOOL DEFINITIONS ---
+CHAT_TOOLS = [
     {
     "type": "function",
     "function": {
@@ -207,11 +311,91 @@ def generate_ai_response(
                         "required": ["request_analysis", "group_by"] # Make it required
                     }
                 }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "find_tasks_in_timeframe",
+                    "description": "List tasks due within N days, active on a date, active during a month, or overlapping a date range.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "request_analysis": {
+                                "type": "string",
+                                "description": "What timeframe is being checked (e.g., 'Tasks due in the next week')."
+                            },
+                            "mode": {"type": "string", "enum": ["due_within_days", "active_on", "active_in_month", "overlapping"]},
+                            "days": {"type": "string", "description": "For due_within_days: how many days ahead (e.g., '7'). Return as a string."},
+                            "target_date": {"type": "string", "description": "For active_on: the date (YYYY-MM-DD)."},
+                            "target_month": {"type": "string", "description": "For active_in_month: the month number (e.g., '3'). Return as a string."},
+                            "target_year": {"type": "string", "description": "For active_in_month: the year (e.g., '2026'). Return as a string."},
+                            "start_date": {"type": "string", "description": "For overlapping: range start (YYYY-MM-DD)."},
+                            "end_date": {"type": "string", "description": "For overlapping: range end (YYYY-MM-DD)."}
+                        },
+                        "required": ["request_analysis", "mode"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "check_workload",
+                    "description": "Find who is over-allocated (too many concurrent open tasks) and when.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "request_analysis": {
+                                "type": "string",
+                                "description": "Whose workload / which period is being checked."
+                            },
+                            "assignee": {"type": "string", "description": "Limit to one person (optional)."},
+                            "start_date": {"type": "string", "description": "Period start (YYYY-MM-DD, optional)."},
+                            "end_date": {"type": "string", "description": "Period end (YYYY-MM-DD, optional)."},
+                            "max_concurrent": {"type": "string", "description": "Concurrent task limit (optional). Return as a string."}
+                        },
+                        "required": ["request_analysis"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_trend_stats",
+                    "description": "Trends over time from recorded task history: burn-down of open tasks, weekly velocity, or due-date slippage.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "request_analysis": {
+                                "type": "string",
+                                "description": "Which trend is requested (e.g., 'How many tasks slipped this month')."
+                            },
+                            "metric": {"type": "string", "enum": ["burndown", "velocity", "slippage"]},
+                            "days": {"type": "string", "description": "Look-back window in days (default '30'). Return as a string."}
+                        },
+                        "required": ["request_analysis", "metric"]
+                    }
+                }
             }
             #rest of the tools can be pasted here
-        ]
+]
+
+# Progress labels shown to streaming clients while a tool runs
+TOOL_PROGRESS_LABELS = {
+    "update_task_field": "Updating task…",
+    "add_task_from_ai": "Adding task…",
+    "check_schedule_conflicts": "Checking schedule conflicts…",
+    "send_project_email": "Queueing email…",
+    "filter_tasks_by_date": "Filtering tasks…",
+    "get_task_statistics": "Calculating statistics…",
+    "find_tasks_in_timeframe": "Checking the timeline…",
+    "check_workload": "Checking workload…",
+    "get_trend_stats": "Analyzing history…",
+}
 
-        system_prompt = f"""You are a PMP certified smart project management assistant. 
+
+def build_system_prompt(tasks_context: str, today_date: str) -> str:
+    """System prompt for the tool-using chat assistant"""
+    system_prompt = f"""You are a PMP certified smart project management assistant. 
             Today's Date: {today_date}
             TASK LIST:
             {tasks_context}
@@ -229,6 +413,9 @@ def generate_ai_response(
             - 'check_schedule_conflicts': Check logic.
             - 'filter_tasks_by_date': only when filetr is requested Filter by Month/Date.
             - 'get_task_statistics': Get counts for charts.
+            - 'find_tasks_in_timeframe': Due soon / active on a date / active in a month / overlapping a date range.
+            - 'check_workload': Who is over-allocated and when.
+            - 'get_trend_stats': Burn-down, velocity and slippage over time (never guess trends).
             - Answer general questions normally
 
             ### CRITICAL INSTRUCTIONS FOR RESPONSE:
@@ -299,22 +486,302 @@ def generate_ai_response(
    
             4. NO SPECIAL CHARACTERS: Avoid using parentheses () or extra quotes "" inside the labels. Use square brackets [] for all labels.               
             """
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        if conversation_history:
-            for msg in conversation_history[-5:]:
-                messages.append({"role": "user", "content": str(msg)})
-        
-        messages.append({"role": "user", "content": str(user_message)})
+    return system_prompt
+
+
+def _history_message(msg) -> dict:
+    """ChatMessage / dict / plain string -> role-correct chat message"""
+    if isinstance(msg, dict):
+        role, content = msg.get("role"), msg.get("content")
+    elif hasattr(msg, "role") and hasattr(msg, "content"):
+        role, content = msg.role, msg.content
+    else:
+        role, content = "user", msg
+    if role not in ("user", "assistant"):
+        role = "user"
+    return {"role": role, "content": str(content)}
+
+
+def build_chat_messages(
+    user_message: str,
+    conversation_history: Optional[List],
+    tasks: List,
+    conversation_summary: Optional[str] = None,
+    content_hash: Optional[str] = None
+) -> List[dict]:
+    """System prompt + rolling summary + unsummarized history + the new user message"""
+    tasks_context = build_tasks_context(tasks, content_hash)
+    today_date = datetime.now().strftime("%Y-%m-%d")
+
+    messages = [{"role": "system", "content": build_system_prompt(tasks_context, today_date)}]
+
+    if conversation_summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{conversation_summary}"})
+
+    # Session history holds exactly the messages not yet in the summary, so all of it is sent;
+    # stateless client history is capped where it's resolved (api.endpoints.resolve_conversation)
+    if conversation_history:
+        for msg in conversation_history:
+            messages.append(_history_message(msg))
+
+    messages.append({"role": "user", "content": str(user_message)})
+    return messages
+
+
+# Tools that only read the task snapshot can run concurrently;
+# everything else (sheet writes, emails) runs one at a time in the order the model asked.
+READ_ONLY_TOOLS = {"check_schedule_conflicts", "filter_tasks_by_date", "get_task_statistics", "find_tasks_in_timeframe",
+                   "check_workload", "get_trend_stats"}
+
+# Per-tool timing: { tool_name: {"calls": n, "total_ms": x, "max_ms": y} }
+TOOL_TIMINGS = {}
+
+# How each tool's result reaches the user:
+#   "local" - rendered from a template (confirmation / table / chart JSON), no second LLM call
+#   "raw"   - the tool's own text is already user-ready and is passed through as-is
+#   "llm"   - the model phrases the result in a second chat completion (default for unknown tools)
+TOOL_RESPONSE_POLICIES = {
+    "update_task_field": "local",
+    "add_task_from_ai": "local",
+    "send_project_email": "local",
+    "get_task_statistics": "local",
+    "filter_tasks_by_date": "local",
+    "check_schedule_conflicts": "raw",
+    "find_tasks_in_timeframe": "raw",
+    "check_workload": "raw",
+    "get_trend_stats": "raw",
+}
+TOOL_RESPONSE_POLICIES.update(TOOL_RESPONSE_POLICY_OVERRIDES)
+
+
+def _record_tool_timing(function_name: str, elapsed_ms: float) -> None:
+    stats = TOOL_TIMINGS.setdefault(function_name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["calls"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    print(f"⏱️ Tool {function_name} took {elapsed_ms:.1f} ms", flush=True)
+
+
+def _parse_tool_args(tool_call) -> dict:
+    try:
+        args = json.loads(tool_call.function.arguments)
+    except Exception as json_err:
+        print(f"❌ JSON Parse Error: {json_err}", flush=True)
+        args = {}
+    return args if isinstance(args, dict) else {}
+
+
+def execute_tool_call(tool_call, tasks: Optional[List] = None) -> tuple:
+    """
+    Runs one tool call returned by the model.
+    `tasks` is the turn's task snapshot, shared by every tool so none of them re-reads the sheet.
+    Returns (function_name, response_text) ready to be appended as a 'tool' message.
+    """
+    function_name = tool_call.function.name
+
+    print(f"🔹 AI CALLED FUNCTION: {function_name}", flush=True)
+
+    args = _parse_tool_args(tool_call)
+    # --- NEW STEP: EXTRACT & PRINT SUMMARY ---
+    # We use .pop() to get the summary AND remove it from 'args'
+    # so it doesn't crash the actual python function later.
+    ai_analysis = args.pop("request_analysis", None)
+    args.pop("tasks", None)  # The snapshot is ours to pass, never the model's
+
+    if ai_analysis:
+        print(f"\n📝 **AI ANALYSIS:** {ai_analysis}")
+        print("-" * 40, flush=True)
+
+    # --- EXECUTE THE ACTUAL FUNCTION ---
+    function_response = "Error: Unknown function."
+
+    try:
+        if function_name == "add_task_from_ai":
+            # We pass **args because 'request_analysis' is already removed
+            function_response = add_task_from_ai(**args, tasks=tasks)
+
+        elif function_name == "update_task_field":
+            # Call the function
+            result_dict = update_task_field(**args)
+            # Extract just the message string for the AI to read
+            # If we don't do this, the AI might get confused receiving a raw JSON object
+            function_response = result_dict["message"]
+
+        elif function_name == "check_schedule_conflicts":
+            function_response = check_schedule_conflicts(tasks=tasks) # No args needed
+
+        elif function_name == "send_project_email":
+            # Queued for the outbox worker; the chat turn never waits on Brevo
+            function_response = queue_project_email(**args)
+
+        elif function_name == "filter_tasks_by_date":
+            function_response = filter_tasks_by_date(**args, tasks=tasks)
+
+        elif function_name == "get_task_statistics":
+            function_response = get_task_statistics(**args, tasks=tasks)
+
+        elif function_name == "find_tasks_in_timeframe":
+            # Due-soon / date-range lookups bisect the snapshot's date index
+            function_response = find_tasks_in_timeframe(**args, tasks=tasks)
+
+        elif function_name == "check_workload":
+            function_response = check_workload(**args, tasks=tasks)
+
+        elif function_name == "get_trend_stats":
+            # Reads the local history log, not the snapshot
+            function_response = get_trend_stats(**args)
+
+        #Function calls here
+
+        # Convert response to string for the LLM
+        function_response = str(function_response)
+
+    except Exception as e:
+        error_msg = f"Error executing {function_name}: {str(e)}"
+        print(f"❌ EXECUTION ERROR: {error_msg}", flush=True)
+        function_response = error_msg
+
+    return function_name, function_response
+
+
+async def _timed_tool_call(tool_call, snapshot: TaskSnapshot) -> tuple:
+    """Runs one tool in a worker thread; analytic tools are served from the memo when possible"""
+    started = time.perf_counter()
+    function_name = tool_call.function.name
+
+    memoize = function_name in MEMOIZED_TOOLS
+    if memoize:
+        args = _parse_tool_args(tool_call)
+        cached = memo_get(function_name, args, snapshot.version)
+        if cached is not None:
+            _record_tool_timing(function_name, (time.perf_counter() - started) * 1000)
+            return function_name, cached
+
+    function_name, function_response = await asyncio.to_thread(execute_tool_call, tool_call, snapshot.tasks)
+    if memoize and not function_response.startswith("Error executing"):
+        memo_set(function_name, args, snapshot.version, function_response)
+
+    _record_tool_timing(function_name, (time.perf_counter() - started) * 1000)
+    return function_name, function_response
+
+
+async def run_tool_calls(tool_calls, snapshot: TaskSnapshot) -> List[tuple]:
+    """
+    Executes a turn's tool calls against the shared task snapshot.
+    Consecutive read-only tools run concurrently; write tools run alone, in order.
+    After a write the snapshot is re-read once, so later reads see the change.
+    Returns [(tool_call, function_name, function_response, tasks the tool saw)] in the model's original order.
+    """
+    results = []
+    pending_reads = []
+
+    async def flush_reads():
+        if pending_reads:
+            outputs = await asyncio.gather(*(_timed_tool_call(tc, snapshot) for tc in pending_reads))
+            results.extend((tc, name, response, snapshot.tasks) for tc, (name, response) in zip(pending_reads, outputs))
+            pending_reads.clear()
+
+    snapshot_stale = False
+    for tool_call in tool_calls:
+        if tool_call.function.name in READ_ONLY_TOOLS:
+            if snapshot_stale:
+                # The write invalidated the store, so this is a fresh sheet read
+                snapshot = await asyncio.to_thread(get_task_snapshot)
+                snapshot_stale = False
+            pending_reads.append(tool_call)
+            continue
+
+        await flush_reads()
+        function_name, function_response = await _timed_tool_call(tool_call, snapshot)
+        results.append((tool_call, function_name, function_response, snapshot.tasks))
+        snapshot_stale = function_name in ("add_task_from_ai", "update_task_field")
+
+    await flush_reads()
+    return results
+
+
+def render_tool_result(tool_call, function_name: str, function_response: str, tasks: List) -> Optional[str]:
+    """
+    Applies the tool's response policy.
+    Returns user-ready text, or None when the LLM should phrase the result.
+    """
+    policy = TOOL_RESPONSE_POLICIES.get(function_name, "llm")
+    if policy == "raw":
+        return function_response
+    if policy != "local":
+        return None
+
+    args = _parse_tool_args(tool_call)
+    try:
+        if function_name == "get_task_statistics":
+            counts = json.loads(function_response)
+            if "error" in counts:
+                return counts["error"]
+            group_by = args.get("group_by") or "status"
+            return render_chart(counts, STATISTICS_CHART_TITLES.get(group_by, "Task Statistics"))
+
+        if function_name == "filter_tasks_by_date":
+            matches = select_tasks_by_date(
+                tasks, args.get("target_month"), args.get("target_year"), args.get("target_date")
+            )
+            return render_task_table(
+                matches,
+                title="Tasks for the requested period",
+                empty_message="No tasks found matching that date criteria."
+            )
+    except (ValueError, TypeError):
+        # Tool returned an error string instead of data; show it as-is
+        return function_response
+
+    return render_confirmation(function_response)
+
+
+def compose_local_answer(results: List[tuple]) -> Optional[str]:
+    """Joins locally rendered tool results; None if any tool needs the LLM to phrase it"""
+    parts = []
+    for tool_call, function_name, function_response, tasks in results:
+        # Each table is rendered from the snapshot its tool read (fresh after a write)
+        rendered = render_tool_result(tool_call, function_name, function_response, tasks)
+        if rendered is None:
+            return None
+        parts.append(rendered)
+    return "\n\n".join(parts)
+
+
+def tool_result_message(tool_call, function_name: str, function_response: str) -> dict:
+    """Message that feeds a tool result back to the model"""
+    return {
+        "tool_call_id": tool_call.id,
+        "role": "tool",
+        "name": function_name,
+        "content": function_response,
+    }
+
+
+async def generate_ai_response(
+    user_message: str, 
+    conversation_history: Optional[List] = None,
+    conversation_summary: Optional[str] = None
+) -> str:
+    """Generate AI response using OpenAI API with DEBUGGING enabled"""
+    try:
+        # Fetch current tasks for context (gspread is blocking -> worker thread)
+        snapshot = await asyncio.to_thread(get_task_snapshot)
+        tasks = snapshot.tasks
+
+        # Structured lookups are answered locally, skipping both LLM round trips
+        fast_answer = await asyncio.to_thread(answer_fast_path, user_message, tasks)
+        if fast_answer:
+            return fast_answer
+
+        messages = build_chat_messages(user_message, conversation_history, tasks, conversation_summary, snapshot.content_hash)
         
         # --- 1. FIRST API CALL ---
         print("🔹 Sending request to OpenAI...", flush=True)
-        response = client.chat.completions.create(
-            #model="llama-4-scout-17b-16e-instruct",
-            #model="llama-3.3-70b-versatile",
-            model="llama-3.1-8b-instant",
+        response = await routed_completion(
+            "tool_selection",
             messages=messages,
-            tools=tools,
+            tools=CHAT_TOOLS,
             tool_choice="auto",
             temperature=0.3
         )
@@ -326,88 +793,24 @@ def generate_ai_response(
         if tool_calls:
             messages.append(response_message)
             
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                tool_id = tool_call.id
-                
-                print(f"🔹 AI CALLED FUNCTION: {function_name}", flush=True)
-                
-                try:
-                    args = json.loads(tool_call.function.arguments)
-                except Exception as json_err:
-                    print(f"❌ JSON Parse Error: {json_err}", flush=True)
-                    args = {}
-
-                if args is None:
-                    args = {} 
-                # --- NEW STEP: EXTRACT & PRINT SUMMARY ---
-                # We use .pop() to get the summary AND remove it from 'args'
-                # so it doesn't crash the actual python function later.
-                ai_analysis = args.pop("request_analysis", None)
-
-                if ai_analysis:
-                    print(f"\n📝 **AI ANALYSIS:** {ai_analysis}")
-                    print("-" * 40, flush=True)
-
-                # --- EXECUTE THE ACTUAL FUNCTION ---
-                function_response = "Error: Unknown function."
-
-                try:
-                    if function_name == "add_task_from_ai":
-                        # We pass **args because 'request_analysis' is already removed
-                        function_response = add_task_from_ai(**args)
-
-                    elif function_name == "update_task_field":
-                        # Call the function
-                        result_dict = update_task_field(**args)
-                        # Extract just the message string for the AI to read
-                        # If we don't do this, the AI might get confused receiving a raw JSON object
-                        function_response = result_dict["message"]
-
-                    elif function_name == "check_schedule_conflicts":
-                        function_response = check_schedule_conflicts() # No args needed
-
-                    elif function_name == "send_project_email":
-                        function_response = send_project_email(**args)
-                    
-                    elif function_name == "filter_tasks_by_date":
-                        function_response = filter_tasks_by_date(**args)
-
-                    elif function_name == "get_task_statistics":
-                        function_response = get_task_statistics(**args)
-
-                    #elif function_name == "get_tasks_due_soon":
-                    #    # We pass the 'tasks' list we fetched at the top of the main function
-                    #    # We also pass the 'days' argument from the AI (defaults to 15 if missing)
-                    #    days_arg = args.get("days", 15)
-                    #    function_response = get_tasks_due_soon(tasks, days=days_arg)    
-                    
-                    #Function calls here
-
-                    # Convert response to string for the LLM
-                    function_response = str(function_response)
-                    
-                except Exception as e:
-                    error_msg = f"Error executing {function_name}: {str(e)}"
-                    print(f"❌ EXECUTION ERROR: {error_msg}", flush=True)
-                    function_response = error_msg
+            results = await run_tool_calls(tool_calls, snapshot)
 
+            # Confirmations, tables and charts don't need the model to restate them
+            local_answer = compose_local_answer(results)
+            if local_answer is not None:
+                print("🔹 Tool results rendered locally, skipping second LLM call", flush=True)
+                return local_answer
+
+            for tool_call, function_name, function_response, _ in results:
                 # --- APPEND FUNCTION RESULT TO MESSAGE HISTORY ---
-                messages.append(
-                    {
-                        "tool_call_id": tool_id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": function_response,
-                    }
-                )
+                messages.append(tool_result_message(tool_call, function_name, function_response))
 
 
             # --- 3. SECOND API CALL (The Fix) ---
             print("🔹 Generating final answer...", flush=True)
             
-            second_response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
+            second_response = await routed_completion(
+                "tool_answer",
                 messages=messages,
                 # remove tools=tools  <-- IMPORTANT: Don't pass tools here
                 # remove tool_choice="auto" <-- IMPORTANT: Don't pass this here
@@ -429,10 +832,125 @@ def generate_ai_response(
         print(f"❌ CRITICAL ERROR: {e}", flush=True)
         return "Sorry, I encountered a system error."
 
+def _accumulate_tool_call_deltas(pending: dict, deltas) -> None:
+    """Stitch streamed tool-call fragments back together, keyed by their index"""
+    for delta in deltas:
+        entry = pending.setdefault(delta.index, {"id": "", "name": "", "arguments": ""})
+        if delta.id:
+            entry["id"] = delta.id
+        if delta.function:
+            if delta.function.name:
+                entry["name"] += delta.function.name
+            if delta.function.arguments:
+                entry["arguments"] += delta.function.arguments
+
+
+async def stream_ai_response(
+    user_message: str,
+    conversation_history: Optional[List] = None,
+    conversation_summary: Optional[str] = None
+) -> AsyncIterator[dict]:
+    """
+    Streaming variant of generate_ai_response.
+    Yields events: {"event": "status" | "token" | "done" | "error", "data": ...}
+    'token' events carry answer text as it arrives from the provider.
+    """
+    try:
+        yield {"event": "status", "data": "Reading task list…"}
+        snapshot = await asyncio.to_thread(get_task_snapshot)
+        tasks = snapshot.tasks
+
+        fast_answer = await asyncio.to_thread(answer_fast_path, user_message, tasks)
+        if fast_answer:
+            yield {"event": "token", "data": fast_answer}
+            yield {"event": "done", "data": {"response": fast_answer, "timestamp": datetime.utcnow().isoformat()}}
+            return
+
+        messages = build_chat_messages(user_message, conversation_history, tasks, conversation_summary, snapshot.content_hash)
+
+        # --- 1. FIRST API CALL (streamed) ---
+        # If the model answers directly, its tokens go straight to the client.
+        print("🔹 Streaming request to OpenAI...", flush=True)
+        stream = routed_stream(
+            "tool_selection",
+            messages=messages,
+            tools=CHAT_TOOLS,
+            tool_choice="auto",
+            temperature=0.3
+        )
+
+        answer_parts = []
+        pending_calls = {}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.tool_calls:
+                _accumulate_tool_call_deltas(pending_calls, delta.tool_calls)
+            elif delta.content:
+                answer_parts.append(delta.content)
+                yield {"event": "token", "data": delta.content}
+
+        # --- 2. HANDLE TOOL CALLS ---
+        if pending_calls:
+            tool_calls = [
+                SimpleNamespace(
+                    id=call["id"],
+                    function=SimpleNamespace(name=call["name"], arguments=call["arguments"] or "{}")
+                )
+                for _, call in sorted(pending_calls.items())
+            ]
+            messages.append({
+                "role": "assistant",
+                "content": "".join(answer_parts) or None,
+                "tool_calls": [
+                    {"id": c.id, "type": "function", "function": {"name": c.function.name, "arguments": c.function.arguments}}
+                    for c in tool_calls
+                ]
+            })
+
+            labels = dict.fromkeys(TOOL_PROGRESS_LABELS.get(c.function.name, "Working…") for c in tool_calls)
+            yield {"event": "status", "data": " ".join(labels)}
+            results = await run_tool_calls(tool_calls, snapshot)
+
+            local_answer = compose_local_answer(results)
+            if local_answer is not None:
+                yield {"event": "token", "data": local_answer}
+                yield {"event": "done", "data": {"response": local_answer, "timestamp": datetime.utcnow().isoformat()}}
+                return
+
+            for tool_call, function_name, function_response, _ in results:
+                messages.append(tool_result_message(tool_call, function_name, function_response))
+
+            # --- 3. SECOND API CALL (streamed) ---
+            yield {"event": "status", "data": "Writing answer…"}
+            answer_parts = []
+            second_stream = routed_stream(
+                "tool_answer",
+                messages=messages,
+                temperature=0.7
+            )
+            async for chunk in second_stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    answer_parts.append(chunk.choices[0].delta.content)
+                    yield {"event": "token", "data": chunk.choices[0].delta.content}
+
+        final_answer = "".join(answer_parts).strip()
+        if not final_answer:
+            final_answer = "✅ Action completed." if pending_calls else \
+                "I processed your request, but I don't have a specific text response for you."
+            yield {"event": "token", "data": final_answer}
+
+        yield {"event": "done", "data": {"response": final_answer, "timestamp": datetime.utcnow().isoformat()}}
+
+    except Exception as e:
+        print(f"❌ STREAMING ERROR: {e}", flush=True)
+        yield {"event": "error", "data": "Sorry, I encountered a system error."}
+
 def get_tasks_by_assignee(assignee_name: str) -> str:
     """Get tasks for a specific assignee - useful for direct queries"""
     try:
-        all_tasks = fetch_all_tasks()
+        all_tasks = get_task_snapshot().tasks
         user_tasks = filter_tasks_by_assignee(all_tasks, assignee_name)
         
         if not user_tasks:
@@ -442,17 +960,37 @@ def get_tasks_by_assignee(assignee_name: str) -> str:
             suggestion = f"Available assignees: {', '.join(sorted(assignees))}" if assignees else ""
             return f"No tasks found assigned to '{assignee_name}'. {suggestion}"
         
-        return format_tasks_for_context(user_tasks)
+        return build_tasks_context(user_tasks)
         
     except Exception as e:
         print(f"❌ Error fetching tasks by assignee: {e}")
         return f"Error retrieving tasks for {assignee_name}"
 
-def summarize_tasks() -> str:
-    """Generate a summary of all project tasks"""
+async def _cached_chat_completion(task_type: str, snapshot_version: int, **kwargs) -> Tuple[str, str]:
+    """
+    routed_completion through the response cache, keyed by (model route, prompt, snapshot version, date).
+    Returns (answer, "HIT" | "MISS").
+    """
+    key = make_cache_key("|".join(route_models(task_type)), kwargs["messages"], snapshot_version)
+    cached = cache_get(key)
+    if cached is not None:
+        return cached, "HIT"
+
+    response = await routed_completion(task_type, **kwargs)
+    answer = response.choices[0].message.content.strip()
+    cache_set(key, answer)
+    return answer, "MISS"
+
+
+async def summarize_tasks() -> Tuple[str, str]:
+    """
+    Generate a summary of all project tasks.
+    Returns (summary, cache_status); one LLM call per task snapshot version per day.
+    """
     try:
-        tasks = fetch_all_tasks()
-        tasks_context = format_tasks_for_context(tasks)
+        snapshot = await asyncio.to_thread(get_task_snapshot)
+        tasks = snapshot.tasks
+        tasks_context = build_tasks_context(tasks, snapshot.content_hash)
         
         # Get the actual current date and year
         now = datetime.now()
@@ -473,11 +1011,10 @@ def summarize_tasks() -> str:
             f"3. If a task is due in {current_year + 1} or {current_year + 2}, it is 'Upcoming', NOT 'Overdue'.\n"
             f"4. Do not hallucinate dates."
         )
-        response = client.chat.completions.create(
-            # 💡 Use the 70b model for summaries if possible, it's much better at logic
-            model="llama-3.1-8b-instant",
-            #model="allam-2-7b",
-            #model="llama-3.3-70b-versatile", 
+        return await _cached_chat_completion(
+            # 💡 Routed to the 70b model first, it's much better at logic (8b on timeout / rate limit)
+            "summarization",
+            snapshot.version,
             messages=[
                 {"role": "system", "content": system_content},
                 {"role": "user", "content": user_content}
@@ -485,28 +1022,26 @@ def summarize_tasks() -> str:
             temperature=0.1, # Lower temperature = less hallucination
             max_tokens=500
         )
-        
-        return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"❌ Error summarizing tasks: {e}")
-        return "Unable to generate summary."
+        return "Unable to generate summary.", "BYPASS"
 
-def simple_ai_chat(user_prompt: str) -> str:
+async def simple_ai_chat(user_prompt: str) -> Tuple[str, str]:
     """
     A simple direct chat function. 
     It trusts the prompt provided by the frontend (which includes the accurate counts).
+    Returns (answer, cache_status); identical prompts are served from the response cache.
     """
     try:
-        response = client.chat.completions.create(
-            #model="llama-3.3-70b-versatile",
-            model="llama-3.1-8b-instant",
+        return await _cached_chat_completion(
+            "chat",
+            peek_snapshot_version(),
             messages=[
                 {"role": "system", "content": "You are a helpful project assistant. user will provide data stats, you simply analyze them."},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.5
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"❌ Error in simple_ai_chat: {e}")
-        return "I'm sorry, I couldn't process the summary request."
+        return "I'm sorry, I couldn't process the summary request.", "BYPASS"
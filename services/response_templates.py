@@ -0,0 +1,74 @@
+import json
+from typing import Dict, List, Optional
+
+# --- LOCAL RESPONSE TEMPLATES ---
+# Render tool results straight to the Markdown / chart JSON the frontend already
+# understands (renderAIMessage), without a round trip to the LLM.
+
+TABLE_COLUMNS = [
+    # (header, task key, fallback)
+    ("ID", "task_id", ""),
+    ("Task", "Task_Name", "Unknown"),
+    ("Assigned", "assigned_to", "Unassigned"),
+    ("Status", "status", "N/A"),
+    ("Start", "start_date", "N/A"),
+    ("Due", "end_date", "N/A"),
+    ("Priority", "Priority", "N/A"),
+    ("Dependencies", "predecessor", "None"),
+]
+
+STATISTICS_CHART_TITLES = {
+    "status": "Tasks by Status",
+    "priority": "Tasks by Priority",
+    "assigned_to": "Tasks by Assignee",
+    "month": "Tasks by Month",
+}
+
+
+def _cell(value, fallback: str) -> str:
+    text = str(value).strip() if value is not None else ""
+    if not text or text.lower() == "none":
+        text = fallback
+    return text.replace("|", "/").replace("\n", " ")
+
+
+def render_task_table(tasks: List[Dict], title: Optional[str] = None, empty_message: str = "No tasks found.") -> str:
+    """Markdown table of tasks (one row per task)"""
+    if not tasks:
+        return empty_message
+
+    lines = []
+    if title:
+        lines.append(f"**{title}** ({len(tasks)})\n")
+    lines.append("| " + " | ".join(header for header, _, _ in TABLE_COLUMNS) + " |")
+    lines.append("|" + "---|" * len(TABLE_COLUMNS))
+    for task in tasks:
+        lines.append("| " + " | ".join(_cell(task.get(key), fallback) for _, key, fallback in TABLE_COLUMNS) + " |")
+    return "\n".join(lines)
+
+
+def render_chart(counts: Dict, title: str, chart_type: str = "bar", summary: Optional[str] = None) -> str:
+    """Chart JSON block in the format the system prompt asks the LLM for"""
+    if not counts:
+        return "No data available for that chart."
+
+    labels = list(counts.keys())
+    values = list(counts.values())
+    if summary is None:
+        total = sum(values)
+        top_label, top_value = max(counts.items(), key=lambda item: item[1])
+        summary = f"{total} tasks in total; the largest group is '{top_label}' with {top_value}."
+
+    chart = {
+        "is_chart": True,
+        "chart_type": chart_type,
+        "title": title,
+        "data": {"labels": labels, "values": values},
+        "summary": summary,
+    }
+    return f"{summary}\n\n```json\n{json.dumps(chart, indent=2)}\n```"
+
+
+def render_confirmation(message: str) -> str:
+    """Mutation results are already phrased for the user (✅ / ❌ ...)"""
+    return str(message).strip() or "✅ Action completed."
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from config import (
+    SCHEDULER_ENABLED, PRECOMPUTE_INTERVAL_SECONDS, TASK_SNAPSHOT_TTL_SECONDS, DIGEST_ENABLED, DIGEST_INTERVAL_HOURS
+)
+from services.google_sheets_service import get_task_statistics, check_schedule_conflicts, get_tasks_due_soon
+from services.kpis import get_kpis
+from services.task_history import compact_history
+from services.digest import run_scheduled_digests
+from services.openai_service import summarize_tasks
+from services.task_store import add_snapshot_listener, get_task_snapshot
+from services.tool_cache import memo_set
+from services import shared_cache
+
+# --- BACKGROUND PRECOMPUTATION ---
+# Derived views (AI summary, status statistics, schedule conflicts, due-soon list, KPIs)
+# are rebuilt off the request path: on a cadence (at most the snapshot TTL), and
+# right after the task snapshot version moves. Endpoints always serve the last
+# computed set, tagged with the snapshot version it was built from.
+# With several workers only one computes each version (claim_once) and publishes
+# the result through the shared cache; the others adopt it on their next run.
+
+_scheduler: Optional[AsyncIOScheduler] = None
+_refresh_lock: Optional[asyncio.Lock] = None
+
+_artifacts = {
+    "version": -1,
+    "summary": None,
+    "statistics": None,
+    "conflicts": None,
+    "due_soon": None,
+    "computed_at": None,
+}
+
+
+async def _retry_summary(version: int) -> None:
+    """The LLM failed on the last run: try the summary again (one worker at a time with the shared cache)"""
+    shared = shared_cache.is_enabled()
+    if shared and not await asyncio.to_thread(shared_cache.try_acquire_lease, "precompute-summary", 120):
+        return
+    try:
+        if shared:
+            published = await asyncio.to_thread(shared_cache.get_value, "artifacts")
+            if published and published["version"] == version and published["summary"] is not None:
+                _artifacts.update(published)  # Another worker already retried it
+                return
+        summary, cache_status = await summarize_tasks()
+        if cache_status == "BYPASS":
+            return  # Still failing; the next tick tries again
+        _artifacts["summary"] = summary
+        if shared:
+            await asyncio.to_thread(shared_cache.put_value, "artifacts", _artifacts)
+        print(f"🗓️ Summary for snapshot v{version} computed on retry", flush=True)
+    finally:
+        if shared:
+            await asyncio.to_thread(shared_cache.release_lease, "precompute-summary")
+
+
+async def refresh_artifacts(force: bool = False) -> Dict:
+    """Recompute every artifact if the task snapshot moved since the last run"""
+    global _refresh_lock
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+
+    async with _refresh_lock:
+        snapshot = await asyncio.to_thread(get_task_snapshot)
+        if not force and snapshot.version == _artifacts["version"]:
+            if _artifacts["summary"] is None:
+                await _retry_summary(snapshot.version)
+            return _artifacts
+
+        if shared_cache.is_enabled():
+            published = await asyncio.to_thread(shared_cache.get_value, "artifacts")
+            if published and published["version"] == snapshot.version and not force:
+                _artifacts.update(published)
+                if _artifacts["summary"] is None:
+                    await _retry_summary(snapshot.version)
+                return _artifacts
+            claimed = await asyncio.to_thread(shared_cache.claim_once, f"precompute:v{snapshot.version}")
+            if not claimed and not force:
+                return _artifacts  # Another worker is computing this version
+
+        tasks = snapshot.tasks
+        statistics = await asyncio.to_thread(get_task_statistics, group_by="status", tasks=tasks)
+        conflicts = await asyncio.to_thread(check_schedule_conflicts, tasks)
+        due_soon = await asyncio.to_thread(get_tasks_due_soon, tasks)
+        get_kpis(snapshot)
+
+        # Seed the chat tool memo so the default questions skip the tool run too
+        memo_set("get_task_statistics", {"group_by": "status"}, snapshot.version, statistics)
+        memo_set("check_schedule_conflicts", {}, snapshot.version, conflicts)
+
+        # Also warms the LLM response cache for this snapshot version
+        summary, cache_status = await summarize_tasks()
+
+        _artifacts.update({
+            "version": snapshot.version,
+            # An LLM error is never served as the summary: None makes /summary compute one and the next tick retry
+            "summary": summary if cache_status != "BYPASS" else None,
+            "statistics": statistics,
+            "conflicts": conflicts,
+            "due_soon": due_soon,
+            "computed_at": datetime.now().isoformat(),
+        })
+        if shared_cache.is_enabled():
+            await asyncio.to_thread(shared_cache.put_value, "artifacts", _artifacts)
+        print(f"🗓️ Precomputed artifacts for snapshot v{snapshot.version}", flush=True)
+        return _artifacts
+
+
+def get_artifacts() -> Optional[Dict]:
+    """The last computed artifacts with the snapshot version they belong to, or None before the first run"""
+    return dict(_artifacts) if _artifacts["version"] >= 0 else None
+
+
+def _on_snapshot_change(old, new) -> None:
+    # May run in a worker thread; APScheduler wakes its loop thread-safely
+    if _scheduler is not None and _scheduler.running:
+        _scheduler.add_job(refresh_artifacts, id="precompute_on_change", replace_existing=True)
+
+
+def start_scheduler() -> None:
+    global _scheduler
+    if not SCHEDULER_ENABLED or _scheduler is not None:
+        return
+    # Never slower than the snapshot TTL, so served artifacts lag the sheet by at most one TTL
+    interval = min(PRECOMPUTE_INTERVAL_SECONDS, TASK_SNAPSHOT_TTL_SECONDS)
+    _scheduler = AsyncIOScheduler()
+    _scheduler.add_job(
+        refresh_artifacts,
+        "interval",
+        seconds=interval,
+        id="precompute_interval",
+        next_run_time=datetime.now(),  # Warm everything right after startup
+        coalesce=True,
+        max_instances=1
+    )
+    _scheduler.add_job(compact_history, "interval", hours=24, id="compact_history", coalesce=True, max_instances=1)
+    if DIGEST_ENABLED:
+        _scheduler.add_job(run_scheduled_digests, "interval", hours=DIGEST_INTERVAL_HOURS, id="send_digests",
+                           coalesce=True, max_instances=1)
+    _scheduler.start()
+    print(f"🗓️ Scheduler started (every {interval:.0f}s)", flush=True)
+
+
+def stop_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
+
+
+add_snapshot_listener(_on_snapshot_change)
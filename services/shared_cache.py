@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional
+from config import SHARED_CACHE_PATH
+
+# --- SHARED CROSS-PROCESS CACHE ---
+# With several uvicorn workers on one box, the task snapshot lives in a SQLite
+# file in WAL mode: readers never block the writer, and one worker at a time
+# (holding the "refresh" lease) reads Google Sheets and publishes the result.
+# The stored version is the single source of truth for every worker.
+# Empty SHARED_CACHE_PATH = disabled (per-process snapshots, as before).
+
+_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_epoch: Optional[str] = None
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+class SharedMeta(NamedTuple):
+    version: int
+    content_hash: str
+    fetched_at: float
+
+
+def is_enabled() -> bool:
+    return bool(SHARED_CACHE_PATH)
+
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(SHARED_CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    with _init_lock:
+        if not _initialized:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshot (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    tasks TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, claimed_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS kv (name TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL);
+            """)
+            _initialized = True
+    return conn
+
+
+def read_meta() -> Optional[SharedMeta]:
+    row = _connect().execute("SELECT version, content_hash, fetched_at FROM snapshot WHERE id = 1").fetchone()
+    return SharedMeta(*row) if row else None
+
+
+def read_tasks() -> Optional[List[Dict]]:
+    row = _connect().execute("SELECT tasks FROM snapshot WHERE id = 1").fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def publish_snapshot(tasks: List[Dict], content_hash: str) -> SharedMeta:
+    """Store freshly fetched tasks; the version moves only if the content changed"""
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT version, content_hash FROM snapshot WHERE id = 1").fetchone()
+        version = row[0] if row else 0
+        if row is None or row[1] != content_hash:
+            version += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot (id, version, content_hash, fetched_at, tasks) VALUES (1, ?, ?, ?, ?)",
+                (version, content_hash, now, json.dumps(tasks, default=str))
+            )
+        else:
+            conn.execute("UPDATE snapshot SET fetched_at = ? WHERE id = 1", (now,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return SharedMeta(version, content_hash, now)
+
+
+def mark_stale() -> None:
+    """After a write: every worker re-reads the sheet on its next access"""
+    _connect().execute("UPDATE snapshot SET fetched_at = 0 WHERE id = 1")
+
+
+def get_epoch() -> str:
+    """Random id of this cache file's version counter (a new file starts a new epoch)"""
+    global _epoch
+    if _epoch is None:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR IGNORE INTO kv (name, value, updated_at) VALUES ('epoch', ?, ?)",
+            (json.dumps(uuid.uuid4().hex[:8]), time.time())
+        )
+        _epoch = get_value("epoch")
+    return _epoch
+
+
+def put_value(name: str, value: Any) -> None:
+    """Publish a JSON-serializable value (e.g. precomputed artifacts) for every worker"""
+    _connect().execute(
+        "INSERT OR REPLACE INTO kv (name, value, updated_at) VALUES (?, ?, ?)",
+        (name, json.dumps(value, default=str), time.time())
+    )
+
+
+def get_value(name: str) -> Optional[Any]:
+    row = _connect().execute("SELECT value FROM kv WHERE name = ?", (name,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def try_acquire_lease(name: str, ttl: float) -> bool:
+    """Elects one holder across processes; an expired lease can be taken over"""
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        acquired = row is None or row[0] == _OWNER or row[1] < now
+        if acquired:
+            conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)", (name, _OWNER, now + ttl))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return acquired
+
+
+def release_lease(name: str) -> None:
+    _connect().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, _OWNER))
+
+
+@contextmanager
+def hold_lease(name: str, ttl: float, wait: float):
+    """
+    Blocks (up to `wait` seconds) until this process holds the lease, releasing it afterwards.
+    Yields whether it was acquired; without a shared cache it's a no-op that yields True.
+    """
+    if not is_enabled():
+        yield True
+        return
+    deadline = time.time() + wait
+    acquired = try_acquire_lease(name, ttl)
+    while not acquired and time.time() < deadline:
+        time.sleep(0.05)
+        acquired = try_acquire_lease(name, ttl)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lease(name)
+
+
+def claim_once(key: str) -> bool:
+    """True for exactly one process per key (e.g. "history:v12"); always True when disabled"""
+    if not is_enabled():
+        return True
+    conn = _connect()
+    now = time.time()
+    cursor = conn.execute("INSERT OR IGNORE INTO claims (key, claimed_at) VALUES (?, ?)", (key, now))
+    conn.execute("DELETE FROM claims WHERE claimed_at < ?", (now - 7 * 86400,))
+    return cursor.rowcount == 1
@@ -0,0 +1,151 @@
+import time
+from typing import Dict, List, Tuple
+from gspread.utils import rowcol_to_a1
+from services.google_sheets_service import get_google_sheet, parse_sheet_date
+from services.task_query import filter_tasks
+from services.task_store import get_task_snapshot, invalidate_task_snapshot
+
+# --- BATCH TASK UPDATES ---
+# PATCH /api/tasks: many edits, one Sheets write. Rows are resolved from a fresh
+# task snapshot (sheet row = position + 2), every entry is validated on its own,
+# and all valid cells go out in a single worksheet.batch_update. Invalid entries
+# are reported without blocking the rest of the batch.
+
+# Accepted change keys (lower-cased) -> sheet header; task_id is never editable
+EDITABLE_FIELDS = {
+    "task_name": "Task_Name",
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "status": "status",
+    "assigned_to": "assigned_to",
+    "client": "Client",
+    "priority": "Priority",
+    "predecessor": "predecessor",
+}
+REQUIRED_FIELDS = {"Task_Name", "start_date", "end_date", "status"}
+DATE_FIELDS = {"start_date", "end_date"}
+WHERE_FILTERS = {"status", "assignee", "client"}
+
+
+def _resolve_targets(update: Dict, tasks: List[Dict], rows_by_id: Dict, rows_by_name: Dict) -> List[Tuple[int, Dict]]:
+    """(sheet row, task) pairs an entry applies to; raises ValueError when it can't be resolved"""
+    if update.get("task_id") not in (None, ""):
+        key = str(update["task_id"]).strip()
+        if key not in rows_by_id:
+            raise ValueError(f"Task id '{key}' not found.")
+        return [rows_by_id[key]]
+
+    if update.get("task_name"):
+        matches = rows_by_name.get(update["task_name"].strip().lower(), [])
+        if not matches:
+            raise ValueError(f"Task '{update['task_name']}' not found.")
+        if len(matches) > 1:
+            raise ValueError(f"Task name '{update['task_name']}' is ambiguous ({len(matches)} rows); use task_id.")
+        return matches
+
+    if update.get("where"):
+        unknown = set(update["where"]) - WHERE_FILTERS
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}. Allowed: {', '.join(sorted(WHERE_FILTERS))}.")
+        selected = {id(t) for t in filter_tasks(tasks, **update["where"])}
+        return [(row, t) for row, t in enumerate(tasks, start=2) if id(t) in selected]
+
+    raise ValueError("Each update needs a task_id, task_name or where filter.")
+
+
+def _validate_changes(changes: Dict, target: Dict, task_ids: set) -> Dict[str, str]:
+    """{header: value} ready to write; raises ValueError on the first invalid change"""
+    if not changes:
+        raise ValueError("No changes given.")
+    cleaned = {}
+    for field, value in changes.items():
+        header = EDITABLE_FIELDS.get(field.strip().lower())
+        if header is None:
+            raise ValueError(f"Field '{field}' can't be updated. Allowed: {', '.join(EDITABLE_FIELDS)}.")
+        value = str(value).strip()
+        if header in REQUIRED_FIELDS and not value:
+            raise ValueError(f"'{header}' can't be empty.")
+        if header in DATE_FIELDS:
+            parsed = parse_sheet_date(value)
+            if parsed is None:
+                raise ValueError(f"'{value}' is not a valid date for {header}.")
+            value = parsed.isoformat()  # Store one format so date logic keeps working
+        if header == "predecessor" and value:
+            if value not in task_ids:
+                raise ValueError(f"Predecessor '{value}' is not an existing task_id.")
+            if value == str(target.get("task_id")).strip():
+                raise ValueError("A task can't be its own predecessor.")
+        cleaned[header] = value
+
+    start = parse_sheet_date(cleaned.get("start_date", target.get("start_date")))
+    end = parse_sheet_date(cleaned.get("end_date", target.get("end_date")))
+    if start and end and start > end:
+        raise ValueError(f"start_date {start} is after end_date {end}.")
+    return cleaned
+
+
+def batch_update_tasks(updates: List[Dict]) -> Dict:
+    """
+    Apply [{"task_id" | "task_name" | "where", "changes"}] with one Sheets write.
+    Returns {"results": [...], "updated", "failed", "cells"} or {"error"} if nothing could be written.
+    """
+    worksheet = get_google_sheet()
+    if not worksheet:
+        return {"error": "Could not connect to Google Sheets"}
+
+    # Row numbers must match the sheet right now, so don't trust a cached snapshot
+    snapshot = get_task_snapshot(max_age=0)
+    if time.time() - snapshot.fetched_at > 5:
+        return {"error": "Could not read Google Sheets"}  # Refresh failed: rows may have moved
+    tasks = snapshot.tasks
+    headers = list(tasks[0].keys()) if tasks else []
+    rows_by_id, rows_by_name = {}, {}
+    for row, task in enumerate(tasks, start=2):
+        rows_by_id.setdefault(str(task.get("task_id")).strip(), (row, task))
+        rows_by_name.setdefault(str(task.get("Task_Name", "")).strip().lower(), []).append((row, task))
+    task_ids = set(rows_by_id)
+
+    results, cells = [], {}
+    for index, update in enumerate(updates):
+        try:
+            targets = _resolve_targets(update, tasks, rows_by_id, rows_by_name)
+            planned = []
+            for row, task in targets:
+                changes = _validate_changes(update.get("changes") or {}, task, task_ids)
+                missing = [h for h in changes if h not in headers]
+                if missing:
+                    raise ValueError(f"Column {', '.join(missing)} not found in the sheet.")
+                planned.append((row, task, changes))
+        except ValueError as e:
+            results.append({"index": index, "success": False, "error": str(e)})
+            continue
+
+        for row, _, changes in planned:
+            for header, value in changes.items():
+                cells[rowcol_to_a1(row, headers.index(header) + 1)] = value  # Later entries win
+        results.append({
+            "index": index,
+            "success": True,
+            "task_ids": [str(task.get("task_id")) for _, task, _ in planned],
+            "changes": planned[0][2] if planned else {},
+        })
+
+    if cells:
+        try:
+            worksheet.batch_update(
+                [{"range": a1, "values": [[value]]} for a1, value in cells.items()],
+                value_input_option="RAW"  # No locale re-parsing or formula evaluation of request values
+            )
+        except Exception as e:
+            print(f"❌ Error in batch update: {e}")
+            for result in results:
+                if result["success"]:
+                    result.update({"success": False, "error": f"Sheets write failed: {e}"})
+            cells = {}
+        else:
+            invalidate_task_snapshot()
+
+    updated = sum(len(r["task_ids"]) for r in results if r["success"])
+    failed = sum(1 for r in results if not r["success"])
+    print(f"🧾 Batch update: {updated} tasks, {len(cells)} cells, {failed} failed entries", flush=True)
+    return {"results": results, "updated": updated, "failed": failed, "cells": len(cells)}
@@ -0,0 +1,84 @@
+import io
+import csv
+import json
+import importlib.util
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from services.google_sheets_service import parse_sheet_date
+
+# --- TASK EXPORT ---
+# GET /api/tasks/export streams the filtered task snapshot as CSV or NDJSON,
+# EXPORT_CHUNK_ROWS rows per chunk, so the full output is never held in memory.
+# Parquet is columnar and is written in one piece from a typed DataFrame
+# (dates as datetimes, task_id as an integer) for BI tools, using pyarrow from
+# requirements.txt. An install without a Parquet engine answers 501 for it.
+
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+DATE_COLUMNS = ("start_date", "end_date")
+
+
+def parquet_engine_available() -> bool:
+    return any(importlib.util.find_spec(module) for module in ("pyarrow", "fastparquet"))
+
+
+def export_columns(tasks: List[Dict], fields: Optional[str]) -> Tuple[List[str], List[str]]:
+    """(columns to export, unknown requested fields); no fields = every sheet column"""
+    known = list(dict.fromkeys(key for task in tasks[:50] for key in task))
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    return requested or known, [f for f in requested if f not in known]
+
+
+def iter_csv(tasks: List[Dict], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for start in range(0, len(tasks), EXPORT_CHUNK_ROWS):
+        writer.writerows([task.get(c, "") for c in columns] for task in tasks[start:start + EXPORT_CHUNK_ROWS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()  # Header only (no matching tasks)
+
+
+def iter_ndjson(tasks: List[Dict], columns: List[str]) -> Iterator[str]:
+    for start in range(0, len(tasks), EXPORT_CHUNK_ROWS):
+        yield "".join(
+            json.dumps({c: task.get(c) for c in columns}, default=str) + "\n"
+            for task in tasks[start:start + EXPORT_CHUNK_ROWS]
+        )
+
+
+def tasks_frame(tasks: List[Dict], columns: List[str]) -> pd.DataFrame:
+    """Typed DataFrame of the tasks (what the Parquet export contains)"""
+    frame = pd.DataFrame([{c: task.get(c) for c in columns} for task in tasks], columns=columns)
+    for column in frame.columns:
+        if column in DATE_COLUMNS:
+            frame[column] = pd.to_datetime(frame[column].map(parse_sheet_date), errors="coerce")
+        elif column == "task_id":
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+        else:
+            # Sheet cells mix ints and strings; Parquet needs one type per column
+            frame[column] = frame[column].map(lambda v: "" if v is None else str(v))
+    return frame
+
+
+def iter_parquet(tasks: List[Dict], columns: List[str], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    buffer = io.BytesIO()
+    tasks_frame(tasks, columns).to_parquet(buffer, index=False)
+    buffer.seek(0)
+    while chunk := buffer.read(chunk_size):
+        yield chunk
+
+
+def stream_export(tasks: List[Dict], columns: List[str], export_format: str) -> Iterator:
+    if export_format == "csv":
+        return iter_csv(tasks, columns)
+    if export_format == "ndjson":
+        return iter_ndjson(tasks, columns)
+    return iter_parquet(tasks, columns)
@@ -0,0 +1,119 @@
+import json
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+from config import TASK_FEED_HEARTBEAT_SECONDS, TASK_FEED_BACKLOG
+from services.change_log import add_change_listener, get_changes_since_token
+from services.task_store import peek_snapshot_version, version_token
+
+# --- LIVE TASK FEED ---
+# Every change-log entry is serialized once into a shared, bounded backlog and
+# pushed to all SSE subscribers. A subscriber only remembers its position in
+# the backlog and waits on one shared asyncio.Event, so an idle connection
+# costs almost nothing. Events (ids and *_token fields are version tokens, so a
+# client never compares versions across a restart or another worker's counter):
+#   snapshot  {"version", "version_token"}                                on connect
+#   delta     {"from_token", "version", "version_token", "added", "updated", "deleted"}
+#   resync    {"version", "version_token"}   the client should refetch /api/tasks
+# SSE comment lines are sent as heartbeats so proxies keep the connection open.
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+_backlog = deque(maxlen=TASK_FEED_BACKLOG)  # (seq, formatted event)
+_seq = 0
+_subscribers = 0
+_stats = {"published": 0, "connections": 0}
+
+
+def format_event(event: str, data: Dict, event_id: Optional[str] = None) -> str:
+    """One Server-Sent Event; the id (version token) lets browsers resume with Last-Event-ID"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _delta_event(from_token: str, changes: Dict) -> str:
+    token = version_token(changes["version"])
+    payload = {
+        "from_token": from_token,
+        "version": changes["version"],
+        "version_token": token,
+        "added": changes["added"],
+        "updated": changes["updated"],
+        "deleted": changes["deleted"],
+    }
+    return format_event("delta", payload, token)
+
+
+def _version_event(event: str, version: int) -> str:
+    token = version_token(version)
+    return format_event(event, {"version": version, "version_token": token}, token)
+
+
+def _publish(text: str) -> None:
+    """Runs on the event loop: append to the backlog and wake every subscriber"""
+    global _seq, _wakeup
+    _seq += 1
+    _backlog.append((_seq, text))
+    _stats["published"] += 1
+    wakeup, _wakeup = _wakeup, asyncio.Event()
+    wakeup.set()
+
+
+def publish_change(entry: Dict) -> None:
+    """Change-log listener; may run on any thread"""
+    if not _subscribers or _loop is None:
+        return
+    text = _delta_event(version_token(entry["from"]), {"version": entry["to"], **entry})
+    try:
+        _loop.call_soon_threadsafe(_publish, text)
+    except RuntimeError:
+        pass  # Event loop already closed (shutdown)
+
+
+async def task_events(since: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    SSE stream for one subscriber.
+    since = the version token the client already has; missed changes are sent first.
+    """
+    global _loop, _wakeup, _subscribers
+    _loop = asyncio.get_running_loop()
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    _subscribers += 1
+    _stats["connections"] += 1
+    cursor = _seq
+
+    try:
+        version = peek_snapshot_version()
+        yield _version_event("snapshot", version)
+        if since and since != version_token(version):
+            changes = get_changes_since_token(since, version)
+            if changes["full_refetch"]:
+                yield _version_event("resync", version)
+            else:
+                yield _delta_event(since, changes)
+
+        while True:
+            # Taken before yielding, so events published meanwhile wake us immediately
+            wakeup = _wakeup
+            oldest = _backlog[0][0] if _backlog else _seq + 1
+            if cursor + 1 < oldest:
+                cursor = _seq
+                yield _version_event("resync", peek_snapshot_version())
+            for seq, text in list(_backlog):
+                if seq > cursor:
+                    cursor = seq
+                    yield text
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=TASK_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+    finally:
+        _subscribers -= 1
+
+
+def get_feed_stats() -> Dict:
+    return {**_stats, "subscribers": _subscribers, "backlog": len(_backlog)}
+
+
+add_change_listener(publish_change)
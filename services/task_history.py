@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import pandas as pd
+from config import TASK_HISTORY_PATH, TASK_HISTORY_RETENTION_DAYS
+from services.google_sheets_service import CLOSED_STATUSES, parse_sheet_date
+from services.response_templates import render_chart
+from services.task_store import add_snapshot_listener
+from services.shared_cache import claim_once, hold_lease
+
+# --- TASK HISTORY STORE ---
+# The sheet only holds current state, so every snapshot version bump is diffed
+# against the last known state and the changed fields are appended to a local
+# NDJSON log, one delta per line:
+#   {"t": epoch, "v": version, "id": task_id, "f": field, "o": old, "n": new}
+# A task that disappears is recorded as f="status", n=None.
+# Compaction folds deltas older than TASK_HISTORY_RETENTION_DAYS into one
+# baseline row per task and field (o=None), so the log stays bounded.
+# With several workers, appends and compaction hold the shared "history-log"
+# lease, so a compaction never drops rows appended while it rewrites the file.
+
+_LOG_LEASE_SECONDS = 30
+
+TRACKED_FIELDS = ("status", "start_date", "end_date", "assigned_to")
+_DELETED = "__deleted__"
+
+_lock = threading.Lock()
+_state: Optional[Dict[str, Dict]] = None  # {task_id: {field: value}} as of the last recorded version
+
+
+def _task_key(task: Dict) -> Optional[str]:
+    key = str(task.get("task_id") or "").strip()
+    return key or None
+
+
+def _read_log() -> List[Dict]:
+    if not TASK_HISTORY_PATH or not os.path.exists(TASK_HISTORY_PATH):
+        return []
+    rows = []
+    with open(TASK_HISTORY_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue  # A torn last line from a crash
+    return rows
+
+
+def _replay(rows: List[Dict]) -> Dict[str, Dict]:
+    state = {}
+    for row in rows:
+        if row["f"] == "status" and row["n"] is None:
+            state.pop(row["id"], None)
+        else:
+            state.setdefault(row["id"], {})[row["f"]] = row["n"]
+    return state
+
+
+def _ensure_loaded() -> Dict[str, Dict]:
+    global _state
+    if _state is None:
+        _state = _replay(_read_log())
+        if _state:
+            print(f"📜 Task history restored ({len(_state)} tasks)", flush=True)
+    return _state
+
+
+def record_snapshot(old, new) -> None:
+    """Snapshot listener: append the field-level changes between the last known state and `new`"""
+    if not TASK_HISTORY_PATH:
+        return
+    with _lock:
+        state = _ensure_loaded()
+        now = int(time.time())
+        rows = []
+        current = {}
+        for task in new.tasks:
+            key = _task_key(task)
+            if key is None:
+                continue
+            fields = {f: str(task.get(f, "") or "").strip() for f in TRACKED_FIELDS}
+            current[key] = fields
+            previous = state.get(key, {})
+            for field, value in fields.items():
+                if previous.get(field) != value:
+                    rows.append({"t": now, "v": new.version, "id": key, "f": field, "o": previous.get(field), "n": value})
+        for key, previous in state.items():
+            if key not in current:
+                rows.append({"t": now, "v": new.version, "id": key, "f": "status", "o": previous.get("status"), "n": None})
+
+        if not rows:
+            return
+        if not claim_once(f"history:v{new.version}"):
+            # Another worker records this version; just track the state
+            state.clear()
+            state.update(current)
+            return
+        try:
+            with hold_lease("history-log", ttl=_LOG_LEASE_SECONDS, wait=_LOG_LEASE_SECONDS) as held:
+                if not held:
+                    raise OSError("history log is locked by another worker")
+                with open(TASK_HISTORY_PATH, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+        except OSError as e:
+            print(f"❌ Could not append task history: {e}")
+            return
+        state.clear()
+        state.update(current)
+        print(f"📜 Recorded {len(rows)} task changes (v{new.version})", flush=True)
+
+
+def compact_history() -> None:
+    """Fold deltas older than the retention window into per-task baseline rows"""
+    if not TASK_HISTORY_PATH or not claim_once(f"history-compact:{date.today()}"):
+        return
+    with _lock, hold_lease("history-log", ttl=_LOG_LEASE_SECONDS, wait=_LOG_LEASE_SECONDS) as held:
+        if not held:
+            print("❌ Could not compact task history: log is locked by another worker")
+            return
+        rows = _read_log()
+        cutoff = time.time() - TASK_HISTORY_RETENTION_DAYS * 86400
+        old_rows = [r for r in rows if r["t"] < cutoff]
+        if not old_rows:
+            return
+        baseline_time = max(r["t"] for r in old_rows)
+        baseline = [
+            {"t": baseline_time, "v": None, "id": key, "f": field, "o": None, "n": value}
+            for key, fields in _replay(old_rows).items()
+            for field, value in fields.items()
+        ]
+        kept = baseline + [r for r in rows if r["t"] >= cutoff]
+        tmp_path = f"{TASK_HISTORY_PATH}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in kept))
+            os.replace(tmp_path, TASK_HISTORY_PATH)
+        except OSError as e:
+            print(f"❌ Could not compact task history: {e}")
+            return
+        print(f"📜 Task history compacted: {len(rows)} -> {len(kept)} rows", flush=True)
+
+
+def load_history_frame() -> pd.DataFrame:
+    """The log as a DataFrame (t as datetime)"""
+    with _lock:
+        rows = _read_log()
+    frame = pd.DataFrame(rows, columns=["t", "v", "id", "f", "o", "n"])
+    frame["t"] = pd.to_datetime(frame["t"], unit="s")
+    return frame
+
+
+def _is_open(status: pd.Series) -> pd.Series:
+    return status.notna() & ~status.fillna("").str.strip().str.lower().isin(CLOSED_STATUSES)
+
+
+def burndown_series(frame: pd.DataFrame, days: int = 30) -> pd.Series:
+    """Open tasks at the end of each day, for the last `days` days"""
+    status = frame[frame["f"] == "status"]
+    end = pd.Timestamp(date.today())
+    index = pd.date_range(end - pd.Timedelta(days=days - 1), end, freq="D")
+    if status.empty:
+        return pd.Series(0, index=index)
+    # Deletions are None; mark them so "last status of the day" doesn't skip over them
+    per_day = (
+        status.assign(day=status["t"].dt.normalize(), n=status["n"].fillna(_DELETED))
+        .groupby(["day", "id"])["n"].last()
+        .unstack()
+    )
+    per_day = per_day.reindex(per_day.index.union(index)).sort_index().ffill()
+    per_day = per_day.loc[index].where(lambda df: df != _DELETED)
+    return per_day.apply(_is_open).sum(axis=1).astype(int)
+
+
+def velocity_series(frame: pd.DataFrame, days: int = 30) -> pd.Series:
+    """Tasks moved into a closed status, per week"""
+    status = frame[(frame["f"] == "status") & frame["o"].notna()]
+    closed = status[~_is_open(status["n"]) & status["n"].notna() & _is_open(status["o"])]
+    closed = closed[closed["t"] >= pd.Timestamp(date.today() - timedelta(days=days))]
+    return closed.set_index("t").resample("W")["id"].count()
+
+
+def slippage_frame(frame: pd.DataFrame, days: int = 30) -> pd.DataFrame:
+    """End dates pushed later, per week: tasks slipped and total days slipped"""
+    moves = frame[(frame["f"] == "end_date") & frame["o"].notna()]
+    moves = moves[moves["t"] >= pd.Timestamp(date.today() - timedelta(days=days))]
+    old_end = pd.to_datetime(moves["o"].map(parse_sheet_date))
+    new_end = pd.to_datetime(moves["n"].map(parse_sheet_date))
+    slipped = (new_end - old_end).dt.days
+    moves = moves.assign(slipped_days=slipped)[slipped > 0]
+    weekly = moves.set_index("t").resample("W").agg({"id": "nunique", "slipped_days": "sum"})
+    return weekly.rename(columns={"id": "tasks", "slipped_days": "days"})
+
+
+def get_history_stats(days: int = 30) -> Dict:
+    frame = load_history_frame()
+    burndown = burndown_series(frame, days)
+    velocity = velocity_series(frame, days)
+    slippage = slippage_frame(frame, days)
+    return {
+        "days": days,
+        "events": len(frame),
+        "burndown": [{"date": d.date().isoformat(), "open": int(n)} for d, n in burndown.items()],
+        "velocity": [{"week": w.date().isoformat(), "completed": int(n)} for w, n in velocity.items()],
+        "slippage": [
+            {"week": w.date().isoformat(), "tasks": int(r["tasks"]), "days": int(r["days"])}
+            for w, r in slippage.iterrows()
+        ],
+    }
+
+
+def get_trend_stats(metric: str = "burndown", days=None) -> str:
+    """Chat tool: burn-down / velocity / slippage from the recorded history, as chart JSON"""
+    try:
+        days = int(str(days).strip()) if str(days or "").strip() else 30
+    except ValueError:
+        days = 30
+    stats = get_history_stats(days)
+    if not stats["events"]:
+        return "No task history has been recorded yet; trends appear once changes are observed."
+
+    if metric == "velocity":
+        counts = {row["week"]: row["completed"] for row in stats["velocity"]}
+        return render_chart(counts, f"Tasks completed per week (last {days} days)", summary="Weekly completions.")
+    if metric == "slippage":
+        counts = {row["week"]: row["days"] for row in stats["slippage"]}
+        total = sum(row["tasks"] for row in stats["slippage"])
+        return render_chart(counts, f"Days slipped per week (last {days} days)",
+                            summary=f"{total} due-date pushes in the period.")
+    counts = {row["date"]: row["open"] for row in stats["burndown"]}
+    return render_chart(counts, f"Open tasks (last {days} days)", chart_type="line", summary="Burn-down of open tasks.")
+
+
+add_snapshot_listener(record_snapshot)
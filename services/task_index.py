@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from services.google_sheets_service import CLOSED_STATUSES, parse_sheet_date
+from services.response_templates import render_task_table
+from services.task_store import get_task_snapshot
+
+# --- TASK DATE INDEX ---
+# Each task's dates are parsed once per snapshot, into two sorted lists:
+# by end date ("due before / between") and by start date. "Active during" and
+# "overlapping" queries bisect both lists and scan only the smaller candidate side.
+# Tasks without an end date are not indexed; a missing start date counts as the end date.
+
+
+class TaskDateIndex:
+    def __init__(self, tasks: List[Dict]):
+        entries = []
+        for task in tasks:
+            end = parse_sheet_date(task.get("end_date"))
+            if end is None:
+                continue
+            start = parse_sheet_date(task.get("start_date")) or end
+            entries.append((min(start, end), end, task))
+
+        self._by_end = sorted(entries, key=lambda e: e[1])
+        self._end_keys = [e[1] for e in self._by_end]
+        self._by_start = sorted(entries, key=lambda e: e[0])
+        self._start_keys = [e[0] for e in self._by_start]
+
+    def __len__(self) -> int:
+        return len(self._by_end)
+
+    def due_between(self, start: date, end: date) -> List[Dict]:
+        """Tasks whose end date falls in [start, end], earliest first"""
+        lo = bisect_left(self._end_keys, start)
+        hi = bisect_right(self._end_keys, end)
+        return [task for _, _, task in self._by_end[lo:hi]]
+
+    def due_before(self, day: date) -> List[Dict]:
+        """Tasks due on or before `day`"""
+        hi = bisect_right(self._end_keys, day)
+        return [task for _, _, task in self._by_end[:hi]]
+
+    def overlapping(self, start: date, end: date) -> List[Dict]:
+        """Tasks whose [start_date, end_date] intersects [start, end], ordered by end date"""
+        started = bisect_right(self._start_keys, end)      # by_start[:started] begin no later than `end`
+        not_ended = bisect_left(self._end_keys, start)     # by_end[not_ended:] finish no earlier than `start`
+        if started <= len(self._by_end) - not_ended:
+            matches = [e for e in self._by_start[:started] if e[1] >= start]
+            matches.sort(key=lambda e: e[1])
+        else:
+            matches = [e for e in self._by_end[not_ended:] if e[0] <= end]
+        return [task for _, _, task in matches]
+
+    def active_on(self, day: date) -> List[Dict]:
+        return self.overlapping(day, day)
+
+    def active_in_month(self, year: int, month: int) -> List[Dict]:
+        first = date(year, month, 1)
+        return self.overlapping(first, first.replace(day=monthrange(year, month)[1]))
+
+
+_lock = threading.Lock()
+_cached = {"tasks": None, "index": None}
+
+
+def get_task_index(tasks: List[Dict]) -> TaskDateIndex:
+    """Index for a snapshot's task list (snapshot lists are never mutated, so identity is the version)"""
+    with _lock:
+        if _cached["tasks"] is not tasks:
+            _cached["index"] = TaskDateIndex(tasks)
+            _cached["tasks"] = tasks
+        return _cached["index"]
+
+
+def _open_only(tasks: List[Dict]) -> List[Dict]:
+    return [t for t in tasks if str(t.get("status", "")).strip().lower() not in CLOSED_STATUSES]
+
+
+def find_tasks_in_timeframe(
+    mode: str = "due_within_days",
+    days=None,
+    target_date: Optional[str] = None,
+    target_month=None,
+    target_year=None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tasks: Optional[List[Dict]] = None
+) -> str:
+    """
+    Chat tool: due-soon / active-on / active-in-month / overlapping-range lookups on the date index.
+    Returns a Markdown table.
+    """
+    if tasks is None:
+        tasks = get_task_snapshot().tasks
+    index = get_task_index(tasks)
+    today = date.today()
+
+    if mode == "active_on":
+        day = parse_sheet_date(target_date) or today
+        return render_task_table(index.active_on(day), title=f"Tasks active on {day}",
+                                 empty_message=f"No tasks active on {day}.")
+
+    if mode == "active_in_month":
+        try:
+            month = int(str(target_month).strip())
+            year = int(str(target_year).strip()) if str(target_year or "").strip() else today.year
+            matches = index.active_in_month(year, month)
+        except ValueError:
+            return "Error: 'active_in_month' needs target_month (1-12)."
+        return render_task_table(matches, title=f"Tasks active in {year}-{month:02d}",
+                                 empty_message=f"No tasks active in {year}-{month:02d}.")
+
+    if mode == "overlapping":
+        start = parse_sheet_date(start_date)
+        end = parse_sheet_date(end_date)
+        if start is None or end is None:
+            return "Error: 'overlapping' needs start_date and end_date (YYYY-MM-DD)."
+        return render_task_table(index.overlapping(start, end), title=f"Tasks running between {start} and {end}",
+                                 empty_message=f"No tasks running between {start} and {end}.")
+
+    # Default: open tasks due in the next N days
+    days = int(str(days).strip()) if days not in (None, "") and str(days).strip().isdigit() else 15
+    cutoff = today + timedelta(days=days)
+    matches = _open_only(index.due_between(today, cutoff))
+    return render_task_table(matches, title=f"Tasks due in the next {days} days",
+                             empty_message=f"✅ No tasks due between {today} and {cutoff}.")
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from services.task_index import get_task_index
+
+# --- TASK QUERIES FOR THE REST API ---
+# Filtering, field projection, pagination and ETags over a task snapshot.
+# ETags are derived from the snapshot's content hash and the query, never from
+# the body, so a repeat request on unchanged data is answered with 304. (Version
+# numbers restart with each process, so they can't identify data on their own.)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def filter_tasks(
+    tasks: List[Dict],
+    status: Optional[str] = None,
+    assignee: Optional[str] = None,
+    client: Optional[str] = None,
+    due_before: Optional[date] = None,
+    active_on: Optional[date] = None
+) -> List[Dict]:
+    """Tasks matching every given filter; status / assignee / client accept comma-separated values"""
+    if due_before or active_on:
+        # Date filters are answered from the snapshot's date index
+        index = get_task_index(tasks)
+        candidates = index.due_before(due_before) if due_before else index.active_on(active_on)
+        if due_before and active_on:
+            active_ids = {id(t) for t in index.active_on(active_on)}
+            candidates = [t for t in candidates if id(t) in active_ids]
+    else:
+        candidates = tasks
+
+    wanted = {
+        "status": {v.lower() for v in _split(status)},
+        "assigned_to": {v.lower() for v in _split(assignee)},
+        "Client": {v.lower() for v in _split(client)},
+    }
+    wanted = {key: values for key, values in wanted.items() if values}
+    if not wanted:
+        return list(candidates)
+    return [
+        t for t in candidates
+        if all(str(t.get(key, "")).strip().lower() in values for key, values in wanted.items())
+    ]
+
+
+def project_tasks(tasks: List[Dict], fields: Optional[str]) -> Tuple[List[Dict], List[str]]:
+    """
+    Keeps only the requested columns (comma-separated).
+    Returns (tasks, unknown_fields); no fields = every column.
+    """
+    requested = _split(fields)
+    if not requested or not tasks:
+        return tasks, []
+    known = set().union(*(t.keys() for t in tasks[:50]))
+    unknown = [f for f in requested if f not in known]
+    return [{f: t.get(f) for f in requested} for t in tasks], unknown
+
+
+def _id_sort_key(task_id: str) -> Tuple[int, float, str]:
+    """Numeric ids compare as numbers (before any non-numeric ones)"""
+    try:
+        return 0, float(task_id), ""
+    except ValueError:
+        return 1, 0.0, task_id
+
+
+def paginate(
+    tasks: List[Dict],
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of tasks and the cursor for the next one.
+    The cursor is the task_id of the last task returned, so pages stay stable when rows are added.
+    If that task has since been deleted, the page resumes at the first task with a higher id.
+    """
+    start = offset
+    if cursor:
+        ids = [str(t.get("task_id")) for t in tasks]
+        if cursor in ids:
+            start = ids.index(cursor) + 1
+        else:
+            after = _id_sort_key(cursor)
+            start = next((i for i, task_id in enumerate(ids) if _id_sort_key(task_id) > after), len(tasks))
+    end = len(tasks) if limit is None else start + limit
+    page = tasks[start:end]
+    next_cursor = str(page[-1].get("task_id")) if page and end < len(tasks) else None
+    return page, next_cursor
+
+
+def make_etag(prefix: str, content_hash: str, **params) -> str:
+    """Strong ETag for (snapshot content, query)"""
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] not in (None, ""))
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:10]
+    return f'"{prefix}-{content_hash[:16]}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match may be "*" or a comma-separated list (weak validators compare equal here)"""
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
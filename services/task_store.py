@@ -0,0 +1,164 @@
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+from config import TASK_SNAPSHOT_TTL_SECONDS, SHARED_REFRESH_LEASE_SECONDS
+from services import shared_cache
+
+# --- TASK SNAPSHOT STORE ---
+# Keeps the last task list read from Google Sheets together with a version
+# number that only moves when the data actually changes. Derived views
+# (LLM caches, KPIs, indexes ...) key themselves on that version.
+# With SHARED_CACHE_PATH set, workers share one snapshot (and version counter)
+# through services.shared_cache instead of each reading the sheet.
+
+
+class TaskSnapshot(NamedTuple):
+    version: int
+    tasks: List[Dict]
+    fetched_at: float
+    content_hash: str
+
+
+_lock = threading.Lock()
+_snapshot = TaskSnapshot(version=0, tasks=[], fetched_at=0.0, content_hash="")
+_BOOT_EPOCH = uuid.uuid4().hex[:8]  # Versions restart with each process; the epoch tells counters apart
+_listeners: List[Callable] = []  # called as listener(old_snapshot, new_snapshot) on every version bump
+
+
+def add_snapshot_listener(listener: Callable) -> None:
+    """Register a callback for version bumps (cache invalidation, change feeds ...)"""
+    _listeners.append(listener)
+
+
+def _content_hash(tasks: List[Dict]) -> str:
+    raw = json.dumps(tasks, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _install(version: Optional[int], tasks: List[Dict], fetched_at: float, content_hash: str) -> TaskSnapshot:
+    """Swap in a new snapshot and notify listeners if the version moved (version=None: bump on change)"""
+    global _snapshot
+    with _lock:
+        previous = _snapshot
+        if version is None:
+            version = previous.version + (1 if content_hash != previous.content_hash else 0)
+        _snapshot = TaskSnapshot(version, tasks, fetched_at, content_hash)
+        current = _snapshot
+
+    if current.version != previous.version:
+        print(f"📦 Task snapshot v{current.version} ({len(tasks)} tasks)", flush=True)
+        for listener in _listeners:
+            try:
+                listener(previous, current)
+            except Exception as e:
+                print(f"❌ Snapshot listener error: {e}")
+    return current
+
+
+def refresh_task_snapshot() -> TaskSnapshot:
+    """
+    Re-read the sheet; bump the version if the content changed.
+    A failed read keeps the previous snapshot (still stale, so the next call retries)
+    instead of installing an empty list that listeners would take for mass deletions.
+    """
+    # Imported here: the sheets service imports this module to invalidate on writes
+    from services.google_sheets_service import read_all_tasks
+
+    tasks = read_all_tasks()
+    if tasks is None:
+        print(f"⚠️ Sheets read failed, keeping task snapshot v{_snapshot.version}", flush=True)
+        return _snapshot
+    content_hash = _content_hash(tasks)
+    if shared_cache.is_enabled():
+        # The shared file owns the version number so every worker agrees on it
+        meta = shared_cache.publish_snapshot(tasks, content_hash)
+        return _install(meta.version, tasks, meta.fetched_at, content_hash)
+
+    return _install(None, tasks, time.time(), content_hash)
+
+
+def _adopt_shared(meta: shared_cache.SharedMeta) -> TaskSnapshot:
+    """Use the snapshot another worker published (tasks are only decoded when they changed)"""
+    current = _snapshot
+    if meta.content_hash == current.content_hash and meta.version == current.version:
+        return _install(current.version, current.tasks, meta.fetched_at, current.content_hash)
+    tasks = shared_cache.read_tasks() or []
+    return _install(meta.version, tasks, meta.fetched_at, meta.content_hash)
+
+
+def _get_shared_snapshot(max_age: float) -> TaskSnapshot:
+    meta = shared_cache.read_meta()
+    if meta and time.time() - meta.fetched_at < max_age:
+        return _adopt_shared(meta)
+
+    # Stale everywhere: one worker refreshes, the others wait for its result
+    if shared_cache.try_acquire_lease("refresh", ttl=SHARED_REFRESH_LEASE_SECONDS):
+        try:
+            return refresh_task_snapshot()
+        finally:
+            shared_cache.release_lease("refresh")
+
+    deadline = time.time() + SHARED_REFRESH_LEASE_SECONDS
+    while time.time() < deadline:
+        time.sleep(0.1)
+        meta = shared_cache.read_meta()
+        if meta and time.time() - meta.fetched_at < max_age:
+            return _adopt_shared(meta)
+    return refresh_task_snapshot()  # The refresher died; don't wait on it any longer
+
+
+def get_task_snapshot(max_age: float = None) -> TaskSnapshot:
+    """Cached snapshot, re-read when older than max_age seconds (TASK_SNAPSHOT_TTL_SECONDS by default)"""
+    max_age = TASK_SNAPSHOT_TTL_SECONDS if max_age is None else max_age
+    if shared_cache.is_enabled():
+        # Checked on every call (one indexed read), so a write through another worker shows up at once
+        return _get_shared_snapshot(max_age)
+    current = _snapshot
+    if current.fetched_at and time.time() - current.fetched_at < max_age:
+        return current
+    return refresh_task_snapshot()
+
+
+def invalidate_task_snapshot() -> None:
+    """Called after writes so the next read goes back to the sheet (in every worker)"""
+    global _snapshot
+    with _lock:
+        _snapshot = _snapshot._replace(fetched_at=0.0)
+    if shared_cache.is_enabled():
+        shared_cache.mark_stale()
+
+
+def get_snapshot_version() -> int:
+    return get_task_snapshot().version
+
+
+def peek_snapshot_version() -> int:
+    """Version of the snapshot already in memory, without touching the sheet"""
+    return _snapshot.version
+
+
+def is_snapshot_fresh(version: int) -> bool:
+    """True if the in-memory snapshot is still `version` and within its TTL (not invalidated by a write)"""
+    current = _snapshot
+    return current.version == version and time.time() - current.fetched_at < TASK_SNAPSHOT_TTL_SECONDS
+
+
+def get_snapshot_epoch() -> str:
+    """Identifies the version counter: this process's, or the shared file's when SHARED_CACHE_PATH is set"""
+    return shared_cache.get_epoch() if shared_cache.is_enabled() else _BOOT_EPOCH
+
+
+def version_token(version: int) -> str:
+    """Version as an opaque cursor ("<epoch>.<version>") that is only valid against the same counter"""
+    return f"{get_snapshot_epoch()}.{version}"
+
+
+def parse_version_token(token: Optional[str]) -> Optional[int]:
+    """The version in a token from this counter, or None (other process, restart, malformed)"""
+    epoch, _, version = str(token or "").rpartition(".")
+    if epoch != get_snapshot_epoch() or not version.isdigit():
+        return None
+    return int(version)
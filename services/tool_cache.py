@@ -0,0 +1,70 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from config import TOOL_CACHE_MAX_ENTRIES
+from services.task_store import add_snapshot_listener
+
+# --- MEMOIZED ANALYTIC TOOLS ---
+# Read-only chat tools return the same text for the same arguments on the same
+# task snapshot, so repeated questions are served from memory. Entries are keyed
+# on (tool, normalized args, snapshot version) and dropped whenever the version moves.
+
+MEMOIZED_TOOLS = {"get_task_statistics", "filter_tasks_by_date", "check_schedule_conflicts"}
+
+_lock = threading.Lock()
+_memo = OrderedDict()  # { (tool, args_key, version): response_text }
+_stats = {name: {"hits": 0, "misses": 0} for name in MEMOIZED_TOOLS}
+
+
+def normalize_tool_args(args: Dict) -> str:
+    """'3', ' 3 ' and 3 are the same month; blank values are the same as missing ones"""
+    normalized = {}
+    for key, value in args.items():
+        if key == "request_analysis":
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+            if value.isdigit():
+                value = int(value)
+        if value in ("", None):
+            continue
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def memo_get(tool_name: str, args: Dict, snapshot_version: int) -> Optional[str]:
+    key = (tool_name, normalize_tool_args(args), snapshot_version)
+    with _lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            _stats[tool_name]["hits"] += 1
+            return _memo[key]
+        _stats[tool_name]["misses"] += 1
+        return None
+
+
+def memo_set(tool_name: str, args: Dict, snapshot_version: int, response: str) -> None:
+    key = (tool_name, normalize_tool_args(args), snapshot_version)
+    with _lock:
+        _memo[key] = response
+        while len(_memo) > TOOL_CACHE_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def clear_tool_cache(*_) -> None:
+    with _lock:
+        _memo.clear()
+
+
+def get_tool_cache_stats() -> Dict:
+    with _lock:
+        stats = {}
+        for name, counts in _stats.items():
+            total = counts["hits"] + counts["misses"]
+            stats[name] = {**counts, "hit_rate": round(counts["hits"] / total, 3) if total else 0.0}
+        return {"entries": len(_memo), "tools": stats}
+
+
+# Writes bump the snapshot version -> every memoized result is stale
+add_snapshot_listener(clear_tool_cache)
@@ -0,0 +1,155 @@
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import WORKLOAD_MAX_CONCURRENT
+from services.google_sheets_service import CLOSED_STATUSES, parse_sheet_date
+from services.task_store import get_task_snapshot
+
+# --- WORKLOAD TIMELINE ---
+# Per-assignee count of concurrently open tasks over time, from one sweep over
+# sorted start/end events (O(n log n)). Timelines are kept between snapshots and
+# only the assignees whose tasks changed (dates, assignee, status) are re-swept.
+#
+# timeline = [{"from": "YYYY-MM-DD", "to": "YYYY-MM-DD", "active": n}, ...]  (inclusive, active > 0 only)
+
+_lock = threading.Lock()
+_state = {"tasks": None, "entries": {}, "timelines": {}}
+
+
+def _task_entries(tasks: List[Dict]) -> Dict[str, Tuple[str, date, date]]:
+    """{task key: (assignee, start, end)} for open tasks with a usable end date"""
+    entries = {}
+    for position, task in enumerate(tasks):
+        if str(task.get("status", "")).strip().lower() in CLOSED_STATUSES:
+            continue
+        end = parse_sheet_date(task.get("end_date"))
+        if end is None:
+            continue
+        start = parse_sheet_date(task.get("start_date")) or end
+        assignee = str(task.get("assigned_to") or "Unassigned").strip() or "Unassigned"
+        key = str(task.get("task_id") or task.get("Task_Name") or f"row-{position}")
+        entries[key] = (assignee, min(start, end), end)
+    return entries
+
+
+def sweep(intervals: List[Tuple[date, date]]) -> List[Dict]:
+    """Concurrent-interval counts from +1/-1 events; intervals are inclusive [start, end]"""
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end + timedelta(days=1), -1))
+    events.sort()
+
+    timeline = []
+    active = 0
+    for i, (day, delta) in enumerate(events):
+        active += delta
+        next_day = events[i + 1][0] if i + 1 < len(events) else None
+        if next_day is None or next_day == day or active == 0:
+            continue
+        segment_end = next_day - timedelta(days=1)
+        if timeline and timeline[-1]["active"] == active and timeline[-1]["to"] == (day - timedelta(days=1)).isoformat():
+            timeline[-1]["to"] = segment_end.isoformat()
+        else:
+            timeline.append({"from": day.isoformat(), "to": segment_end.isoformat(), "active": active})
+    return timeline
+
+
+def get_workload(tasks: List[Dict]) -> Dict[str, List[Dict]]:
+    """{assignee: timeline} for a snapshot's tasks, re-sweeping only assignees that changed"""
+    with _lock:
+        if _state["tasks"] is tasks:
+            return _state["timelines"]
+
+        old_entries = _state["entries"]
+        new_entries = _task_entries(tasks)
+
+        changed = set()
+        for key in old_entries.keys() | new_entries.keys():
+            old, new = old_entries.get(key), new_entries.get(key)
+            if old != new:
+                changed.update(entry[0] for entry in (old, new) if entry)
+
+        by_assignee = defaultdict(list)
+        for assignee, start, end in new_entries.values():
+            if assignee in changed:
+                by_assignee[assignee].append((start, end))
+
+        timelines = dict(_state["timelines"])
+        for assignee in changed:
+            if by_assignee.get(assignee):
+                timelines[assignee] = sweep(by_assignee[assignee])
+            else:
+                timelines.pop(assignee, None)
+
+        if changed:
+            print(f"👥 Workload re-swept for {len(changed)} assignee(s)", flush=True)
+        _state.update({"tasks": tasks, "entries": new_entries, "timelines": timelines})
+        return timelines
+
+
+def clip_timeline(timeline: List[Dict], start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+    clipped = []
+    for segment in timeline:
+        seg_from, seg_to = date.fromisoformat(segment["from"]), date.fromisoformat(segment["to"])
+        if (start and seg_to < start) or (end and seg_from > end):
+            continue
+        clipped.append({
+            "from": max(seg_from, start).isoformat() if start else segment["from"],
+            "to": min(seg_to, end).isoformat() if end else segment["to"],
+            "active": segment["active"],
+        })
+    return clipped
+
+
+def build_workload_report(
+    tasks: List[Dict],
+    assignee: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    max_concurrent: int = WORKLOAD_MAX_CONCURRENT
+) -> Dict:
+    """Per-assignee timeline, peak and over-allocation windows (active > max_concurrent)"""
+    report = {}
+    for name, timeline in sorted(get_workload(tasks).items()):
+        if assignee and assignee.strip().lower() not in name.lower():
+            continue
+        segments = clip_timeline(timeline, start, end)
+        if not segments:
+            continue
+        report[name] = {
+            "peak": max(s["active"] for s in segments),
+            "overallocated": [s for s in segments if s["active"] > max_concurrent],
+            "segments": segments,
+        }
+    return report
+
+
+def check_workload(
+    assignee: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    max_concurrent=None,
+    tasks: Optional[List[Dict]] = None
+) -> str:
+    """Chat tool: who is over-allocated, and when"""
+    if tasks is None:
+        tasks = get_task_snapshot().tasks
+    try:
+        limit = int(str(max_concurrent).strip()) if str(max_concurrent or "").strip() else WORKLOAD_MAX_CONCURRENT
+    except ValueError:
+        limit = WORKLOAD_MAX_CONCURRENT
+
+    report = build_workload_report(tasks, assignee, parse_sheet_date(start_date), parse_sheet_date(end_date), limit)
+    if not report:
+        return "No open tasks with dates found for that person / period."
+
+    lines = []
+    for name, info in report.items():
+        for window in info["overallocated"]:
+            lines.append(f"- {name}: {window['active']} concurrent tasks from {window['from']} to {window['to']}")
+    if not lines:
+        peaks = ", ".join(f"{name} (peak {info['peak']})" for name, info in report.items())
+        return f"✅ No one has more than {limit} concurrent open tasks. {peaks}"
+    return f"⚠️ Over-allocation (more than {limit} concurrent open tasks):\n" + "\n".join(lines)